@@ -1,109 +1,301 @@
 import requests
 from bs4 import BeautifulSoup
 import csv
+import sys
 import time
 import re
 
-def scrape_stock_data(base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=", start_page=1, max_pages=198):
-   
+from main import release_soup
+from retry_queue import ItemOutcome, RetryQueue, Status, is_retryable_status, replay_dead_letters
+
+def parse_listing_rows(soup):
+    """
+    Extract company rows from a parsed listing page
     
-    stocks_data = []
-    page = start_page
-    stock_counter = 1  # Start numbering from 1
+    Args:
+        soup: BeautifulSoup object of a screen results page
     
-    # Headers to mimic a real browser request
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    Returns:
+        List of dictionaries with Company Id, Name and Url, or None if the
+        page has no results table
+    """
+    table = soup.find('table', class_='data-table')
     
-    while page <= max_pages:
-        print(f"Progress: Page {page}/{max_pages} ({((page-1)/max_pages)*100:.1f}%)")
-            
-        url = f"{base_url}{page}"
-        print(f"Scraping page {page}: {url}")
-        
+    if not table:
+        return None
+    
+    listing_rows = []
+    for row in table.find_all('tr', attrs={'data-row-company-id': True}):
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find the data table
-            table = soup.find('table', class_='data-table')
-            
-            if not table:
-                print(f"No table found on page {page}")
-                break
-            
-         
-            rows = table.find_all('tr', attrs={'data-row-company-id': True})
+            # Extract company name and URL 
+            name_cells = row.find_all('td', class_='text')
+            if len(name_cells) < 2:
+                continue
             
-            if not rows:
-                print(f"No data rows found on page {page}, but continuing...")
-                page += 1
+            link = name_cells[1].find('a')
+            if not link:
                 continue
             
-            page_stocks = []
-            for row in rows:
-                try:
-                    # Extract company name and URL 
-                    name_cells = row.find_all('td', class_='text')
-                    if len(name_cells) < 2:
-                        continue
-                    
-
-                    name_cell = name_cells[1]
-                    link = name_cell.find('a')
-                    
-                    if link:
-                        company_name = link.get_text(strip=True)
-                        relative_url = link.get('href')
-                        
-                        # Construct full URL
-                        if relative_url.startswith('/'):
-                            full_url = f"https://www.screener.in{relative_url}"
-                        else:
-                            full_url = relative_url
-                        
-                        stock_data = {
-                            'S.No': stock_counter, 
-                            'Name': company_name,
-                            'Url': full_url
-                        }
-                        
-                        page_stocks.append(stock_data)
-                        print(f"  Found: {stock_counter} - {company_name}")
-                        stock_counter += 1 
-                
-                except Exception as e:
-                    print(f"Error processing row: {e}")
-                    continue
+            relative_url = link.get('href')
             
-            if page_stocks:
-                stocks_data.extend(page_stocks)
-                print(f"Page {page}: Found {len(page_stocks)} stocks (Total: {len(stocks_data)})")
+            # Construct full URL
+            if relative_url.startswith('/'):
+                full_url = f"https://www.screener.in{relative_url}"
             else:
-                print(f"No stocks found on page {page}, continuing...")
+                full_url = relative_url
             
+            listing_rows.append({
+                'Company Id': row['data-row-company-id'],
+                'Name': link.get_text(strip=True),
+                'Url': full_url
+            })
+        
+        except Exception as e:
+            print(f"Error processing row: {e}")
+            continue
+    
+    return listing_rows
+
 
-            if len(stocks_data) >= 4938:
-                print(f"Reached expected total of 4938 stocks, stopping at page {page}")
-                break
+def fetch_listing_page_outcome(page, base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=", headers=None):
+    """
+    Fetch and parse one listing page
+    
+    Args:
+        page: Page number
+        base_url: Listing URL without the page number
+        headers: Request headers
+    
+    Returns:
+        ItemOutcome whose value is the page's listing rows, or None if the
+        page has no results table (past the end of the listing)
+    """
+    url = f"{base_url}{page}"
+    
+    try:
+        response = requests.get(url, headers=headers, timeout=30)
+        response.raise_for_status()
+        
+        soup = BeautifulSoup(response.content, 'html.parser')
+        response.close()
+        del response
+    except requests.exceptions.RequestException as e:
+        status_code = getattr(e.response, 'status_code', None)
+        return ItemOutcome(page, Status.FAILED, error=str(e), retryable=is_retryable_status(status_code))
+    
+    try:
+        listing_rows = parse_listing_rows(soup)
+    except Exception as e:
+        return ItemOutcome(page, Status.FAILED, error=f"parse error: {e}")
+    finally:
+        release_soup(soup)
+    
+    return ItemOutcome(page, Status.OK if listing_rows else Status.EMPTY, value=listing_rows)
+
+
+def iter_stock_pages(base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=", start_page=1, max_pages=198,
+                     max_attempts=5, dead_letter_file="dead_letters.jsonl"):
+    """
+    Yield the stocks found on each listing page, one page at a time
+    
+    The parsed page and response body are released before the next page is
+    fetched, so a caller that writes each batch out keeps memory flat.
+    
+    A page that fails to fetch does not stop the crawl: it is queued and
+    retried with exponential backoff after the last page, and dead-lettered
+    if it keeps failing. The crawl ends at the first page without a results
+    table (or max_pages), not at a fixed stock count.
+    
+    This is a single pass: companies repeated across pages are skipped, but
+    a reorder mid-crawl can still skip a company. Use
+    company_master.crawl_listing_snapshot for a drift-checked snapshot.
+    
+    Args:
+        base_url: Listing URL without the page number
+        start_page: First page to fetch
+        max_pages: Last page to fetch
+        max_attempts: Attempts per page before it is dead-lettered
+        dead_letter_file: JSON lines file of pages that kept failing
+    """
+    
+    total_found = 0
+    page = start_page
+    stock_counter = 1  # Start numbering from 1
+    seen_company_ids = set()
+    retry_queue = RetryQueue(max_attempts=max_attempts, dead_letter_file=dead_letter_file, kind='listing_page')
+    
+    # Headers to mimic a real browser request
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    def new_stocks(listing_rows):
+        nonlocal stock_counter
+        page_stocks = []
+        for listing_row in listing_rows:
+            # The screen can reorder between page requests; skip companies
+            # already returned on an earlier page
+            if listing_row['Company Id'] in seen_company_ids:
+                print(f"  Skipping duplicate: {listing_row['Name']} (id {listing_row['Company Id']})")
+                continue
+            seen_company_ids.add(listing_row['Company Id'])
             
-            page += 1
+            stock_data = {
+                'S.No': stock_counter, 
+                'Name': listing_row['Name'],
+                'Url': listing_row['Url']
+            }
             
-      
-            time.sleep(2) 
+            page_stocks.append(stock_data)
+            print(f"  Found: {stock_counter} - {listing_row['Name']}")
+            stock_counter += 1 
+        return page_stocks
+    
+    while page <= max_pages:
+        print(f"Progress: Page {page}/{max_pages} ({((page-1)/max_pages)*100:.1f}%)")
+        print(f"Scraping page {page}: {base_url}{page}")
         
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching page {page}: {e}")
-            break
-        except Exception as e:
-            print(f"Unexpected error on page {page}: {e}")
+        outcome = fetch_listing_page_outcome(page, base_url, headers)
+        
+        if not outcome.ok:
+            print(f"Error on page {page}: {outcome.error}")
+            retry_queue.push(outcome)
+            page += 1
+            time.sleep(2)
+            continue
+        
+        listing_rows = outcome.value
+        
+        if listing_rows is None:
+            print(f"No table found on page {page}")
             break
+        
+        if not listing_rows:
+            print(f"No data rows found on page {page}, but continuing...")
+            page += 1
+            continue
+        
+        page_stocks = new_stocks(listing_rows)
+        
+        if page_stocks:
+            total_found += len(page_stocks)
+            print(f"Page {page}: Found {len(page_stocks)} stocks (Total: {total_found})")
+            yield page_stocks
+        else:
+            print(f"No stocks found on page {page}, continuing...")
+        
+        page += 1
+        
+  
+        time.sleep(2) 
+    
+    if len(retry_queue):
+        print(f"\nRetrying {len(retry_queue)} failed pages...")
+    
+    for outcome in retry_queue.drain(lambda failed_page: fetch_listing_page_outcome(failed_page, base_url, headers)):
+        page_stocks = new_stocks(outcome.value or [])
+        if page_stocks:
+            total_found += len(page_stocks)
+            print(f"Page {outcome.item} (retry): Found {len(page_stocks)} stocks (Total: {total_found})")
+            yield page_stocks
+    
+    if retry_queue.dead_lettered:
+        print(f"WARNING: {retry_queue.dead_lettered} pages failed permanently, see {dead_letter_file}")
+        print("Run with --replay to fetch them again into the saved CSV")
+
+
+def scrape_stock_data(base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=", start_page=1, max_pages=198):
+    """
+    Scrape the full listing into memory
+    
+    Args:
+        base_url: Listing URL without the page number
+        start_page: First page to fetch
+        max_pages: Last page to fetch
+    """
+    stocks_data = []
+    for page_stocks in iter_stock_pages(base_url, start_page, max_pages):
+        stocks_data.extend(page_stocks)
     
     return stocks_data
 
+
+def stream_stock_data_to_csv(filename='stocks_data.csv', base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=", start_page=1, max_pages=198):
+    """
+    Scrape the listing and write each page to CSV as soon as it is parsed
+    
+    Unlike scrape_stock_data, no stock rows are kept in memory.
+    
+    Args:
+        filename: Output CSV filename
+        base_url: Listing URL without the page number
+        start_page: First page to fetch
+        max_pages: Last page to fetch
+    
+    Returns:
+        Number of stocks written
+    """
+    total_written = 0
+    
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['S.No', 'Name', 'Url'])
+        writer.writeheader()
+        
+        for page_stocks in iter_stock_pages(base_url, start_page, max_pages):
+            writer.writerows(page_stocks)
+            csvfile.flush()
+            total_written += len(page_stocks)
+    
+    print(f"Data streamed to {filename}")
+    print(f"Total stocks saved: {total_written}")
+    return total_written
+
+def replay_failed_pages(filename='all_bse_companies.csv', base_url="https://www.screener.in/screens/41897/all-bse-companies/?page=",
+                        dead_letter_file="dead_letters.jsonl", max_attempts=5):
+    """
+    Re-fetch dead-lettered listing pages and append their stocks to a saved CSV
+    
+    Stocks already in the CSV (matched on Url) are skipped and numbering
+    continues from its last S.No.
+    
+    Args:
+        filename: Listing CSV written by save_to_csv or stream_stock_data_to_csv
+        base_url: Listing URL without the page number
+        dead_letter_file: JSON lines file of pages that kept failing
+        max_attempts: Attempts per page before it is dead-lettered again
+    
+    Returns:
+        Number of stocks appended
+    """
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+        saved = list(csv.DictReader(csvfile))
+    seen_urls = {stock['Url'] for stock in saved}
+    stock_counter = max((int(stock['S.No']) for stock in saved), default=0) + 1
+    added = 0
+    
+    with open(filename, 'a', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['S.No', 'Name', 'Url'])
+        
+        for outcome in replay_dead_letters(lambda page: fetch_listing_page_outcome(page, base_url, headers),
+                                           'listing_page', dead_letter_file, max_attempts):
+            for listing_row in outcome.value or []:
+                if listing_row['Url'] in seen_urls:
+                    continue
+                seen_urls.add(listing_row['Url'])
+                
+                writer.writerow({'S.No': stock_counter, 'Name': listing_row['Name'], 'Url': listing_row['Url']})
+                print(f"  Found: {stock_counter} - {listing_row['Name']}")
+                stock_counter += 1
+                added += 1
+            csvfile.flush()
+    
+    print(f"Replayed listing pages: {added} stocks appended to {filename}")
+    return added
+
 def save_to_csv(stocks_data, filename='stocks_data.csv'):
     """
     Save stock data to CSV file
@@ -189,6 +381,10 @@ def scrape_from_html_file(html_file_path):
 
 if __name__ == "__main__":
 
+    if len(sys.argv) > 1 and sys.argv[1] == '--replay':
+        replay_failed_pages('all_bse_companies.csv')
+        sys.exit(0)
+
     print("Starting stock data scraping...")
     
 
@@ -0,0 +1,251 @@
+import json
+import mmap
+import os
+import re
+import sys
+
+from pypdf import PdfReader
+
+
+# Keywords identifying the sections downstream consumers ask for
+SECTION_KEYWORDS = {
+    'mdna': ["management discussion", "management's discussion", "management’s discussion"],
+    'directors_report': ["directors' report", "directors’ report", "directors report", "board's report", "board’s report", "boards' report"],
+    'financial_statements': ["consolidated financial statements", "standalone financial statements", "financial statements"],
+    'corporate_governance': ["corporate governance"],
+}
+
+# How many leading pages to search for a printed table of contents
+TOC_SCAN_PAGES = 8
+
+# A contents line: a title followed by a printed page number
+TOC_LINE_PATTERN = re.compile(r'^\s*(?P<title>[A-Za-z][^\n]{3,120}?)[\s.…-]{2,}(?P<page>\d{1,4})\s*$')
+
+
+class AnnualReport:
+    """
+    A memory-mapped annual report PDF
+
+    Only the cross-reference table is read on open; page objects and their
+    content streams are parsed when a page is actually requested.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.reader = PdfReader(self._map)
+
+    def close(self):
+        # Drop the reader first so it holds no buffer exported from the map
+        self.reader = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def page_count(self):
+        return len(self.reader.pages)
+
+    def read_pages(self, start, end):
+        """Extract the text of pages start..end (0-based, inclusive)"""
+        end = min(end, self.page_count - 1)
+        return [self.reader.pages[number].extract_text() or '' for number in range(start, end + 1)]
+
+
+def _outline_entries(reader, outline=None, depth=0):
+    """Flatten the PDF outline (bookmarks) to [{'title', 'page', 'depth'}]"""
+    entries = []
+    for item in reader.outline if outline is None else outline:
+        if isinstance(item, list):
+            entries.extend(_outline_entries(reader, item, depth + 1))
+            continue
+        try:
+            page = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page is not None and page >= 0:
+            entries.append({'title': str(item.title).strip(), 'page': page, 'depth': depth})
+    return entries
+
+
+def _printed_toc_entries(report):
+    """
+    Read the printed table of contents from the first pages
+
+    Printed page numbers rarely match PDF page indexes (covers, inserts), so
+    the offset is found by checking a few candidate pages for the title of
+    the first entry.
+    """
+    toc_pages = report.read_pages(0, TOC_SCAN_PAGES - 1)
+    entries = []
+    for text in toc_pages:
+        for line in text.splitlines():
+            match = TOC_LINE_PATTERN.match(line)
+            if match:
+                entries.append({'title': match.group('title').strip(' .'), 'printed_page': int(match.group('page'))})
+
+    if not entries:
+        return []
+
+    offset = 0
+    probe = entries[len(entries) // 2]
+    for candidate in range(-2, 9):
+        number = probe['printed_page'] - 1 + candidate
+        if 0 <= number < report.page_count:
+            text = report.read_pages(number, number)[0].lower()
+            if probe['title'].lower()[:30] in text:
+                offset = candidate
+                break
+
+    return [
+        {'title': entry['title'], 'page': entry['printed_page'] - 1 + offset, 'depth': 0}
+        for entry in entries
+        if 0 <= entry['printed_page'] - 1 + offset < report.page_count
+    ]
+
+
+def _classify(title):
+    lowered = title.lower()
+    for section, keywords in SECTION_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return section
+    return None
+
+
+def build_section_index(path):
+    """
+    Build the page-level table of contents and section index of a report
+
+    Returns:
+        Dictionary with the file's size and mtime (to detect changes),
+        page_count, toc entries and sections: name -> [start, end] pages
+    """
+    with AnnualReport(path) as report:
+        page_count = report.page_count
+        toc = _outline_entries(report.reader) if report.reader.outline else []
+        source = 'outline'
+        if not toc:
+            toc = _printed_toc_entries(report)
+            source = 'printed_toc'
+
+    toc.sort(key=lambda entry: entry['page'])
+
+    sections = {}
+    for i, entry in enumerate(toc):
+        section = _classify(entry['title'])
+        if not section or section in sections:
+            continue
+        # A section runs until the next entry at the same or a higher level
+        end = page_count - 1
+        for following in toc[i + 1:]:
+            if following['depth'] <= entry['depth'] and following['page'] > entry['page']:
+                end = following['page'] - 1
+                break
+        sections[section] = [entry['page'], end]
+
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'page_count': page_count,
+        'source': source,
+        'toc': toc,
+        'sections': sections,
+    }
+
+
+def load_section_index(path):
+    """Return the section index of a report, building it once and caching it next to the file"""
+    index_path = f"{path}.index.json"
+    stat = os.stat(path)
+
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime:
+            return index
+
+    index = build_section_index(path)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return index
+
+
+def read_section(path, section, max_pages=None):
+    """
+    Extract the text of one section of a report, reading only its pages
+
+    Args:
+        path: Annual report PDF
+        section: Key of SECTION_KEYWORDS, e.g. 'mdna'
+        max_pages: Read at most this many pages of the section
+
+    Returns:
+        Section text, or None if the report has no such section in its index
+    """
+    index = load_section_index(path)
+    if section not in index['sections']:
+        return None
+
+    start, end = index['sections'][section]
+    if max_pages:
+        end = min(end, start + max_pages - 1)
+
+    with AnnualReport(path) as report:
+        return '\n'.join(report.read_pages(start, end))
+
+
+def extract_section_from_reports(report_dir, section, output_dir=None, max_pages=None):
+    """
+    Extract one section from every PDF in a directory tree
+
+    Args:
+        report_dir: Directory searched recursively for .pdf files
+        section: Key of SECTION_KEYWORDS
+        output_dir: Where to write <report>.<section>.txt (defaults to next to each report)
+        max_pages: Page cap per report
+
+    Returns:
+        Number of reports the section was found in
+    """
+    found = 0
+    missing = 0
+
+    for root, _, files in os.walk(report_dir):
+        for name in sorted(files):
+            if not name.lower().endswith('.pdf'):
+                continue
+            path = os.path.join(root, name)
+
+            try:
+                text = read_section(path, section, max_pages)
+            except Exception as e:
+                print(f"  Error reading {path}: {e}")
+                missing += 1
+                continue
+
+            if text is None:
+                print(f"  No {section} section indexed in {path}")
+                missing += 1
+                continue
+
+            target_dir = output_dir or root
+            os.makedirs(target_dir, exist_ok=True)
+            with open(os.path.join(target_dir, f"{os.path.splitext(name)[0]}.{section}.txt"), 'w', encoding='utf-8') as f:
+                f.write(text)
+            found += 1
+
+    print(f"Extracted {section} from {found} reports ({missing} without it)")
+    return found
+
+
+if __name__ == "__main__":
+    report_dir = sys.argv[1] if len(sys.argv) > 1 else "annual_reports"
+    section = sys.argv[2] if len(sys.argv) > 2 else "mdna"
+    extract_section_from_reports(report_dir, section)
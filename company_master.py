@@ -0,0 +1,267 @@
+import csv
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+
+from all_stocks_scraper import parse_listing_rows
+from main import release_soup
+
+
+LISTING_URL = "https://www.screener.in/screens/41897/all-bse-companies/?page="
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+MASTER_FIELDS = ['Company Id', 'Name', 'Url']
+
+
+def fetch_listing_page(session, page, base_url=LISTING_URL):
+    """Fetch one listing page and return its rows (None if the page has no table)"""
+    response = session.get(f"{base_url}{page}", headers=HEADERS, timeout=30)
+    try:
+        response.raise_for_status()
+        soup = BeautifulSoup(response.content, 'html.parser')
+    finally:
+        response.close()
+
+    listing_rows = parse_listing_rows(soup)
+    release_soup(soup)
+    return listing_rows
+
+
+def fetch_listing_pages(session, pages, delay=2, base_url=LISTING_URL):
+    """
+    Fetch the given listing pages in order, stopping at the first page
+    without a table (past the end of the listing)
+
+    Returns:
+        (page number -> listing rows, list of pages that failed to fetch,
+        first page past the end of the listing or None if not reached)
+    """
+    page_rows = {}
+    failed_pages = []
+
+    for page in pages:
+        print(f"Scraping page {page}")
+        try:
+            listing_rows = fetch_listing_page(session, page, base_url)
+        except requests.RequestException as e:
+            print(f"Error fetching page {page}: {e}")
+            failed_pages.append(page)
+            time.sleep(delay)
+            continue
+        time.sleep(delay)
+
+        if listing_rows is None:
+            return page_rows, failed_pages, page
+        page_rows[page] = listing_rows
+
+    return page_rows, failed_pages, None
+
+
+def changed_pages(previous_ids, current_ids):
+    """
+    Pages whose company ids differ between two reads of the listing
+
+    Args:
+        previous_ids: Dictionary of page number -> list of company ids
+        current_ids: Same, from the later read
+
+    Returns:
+        Sorted list of page numbers that differ or exist in only one read
+    """
+    pages = set(previous_ids) | set(current_ids)
+    return sorted(page for page in pages if previous_ids.get(page) != current_ids.get(page))
+
+
+def crawl_listing_snapshot(max_pages=198, max_rounds=4, delay=2, base_url=LISTING_URL):
+    """
+    Crawl the full listing, deduplicated on company id
+
+    A single pass cannot tell when the screen reorders mid-crawl: a company
+    removed ahead of the crawl position shifts every later page left by one
+    row and the row that crosses a page boundary is never seen. So every
+    page is read twice, and a page counts as confirmed once two reads in a
+    row return the same company ids. A removal or insertion only shifts
+    rows from its own page on, so when a page changes, the following round
+    re-fetches the pages from there to the end, and earlier pages are
+    walked back until one is unchanged. Pages that failed or have been read
+    only once are re-fetched too. Gives up after max_rounds rounds.
+
+    Returns:
+        List of company dictionaries in listing order, or None if some page
+        could not be fetched or the listing did not settle. A missing page
+        must never be read as delisted companies, so no partial snapshot is
+        returned.
+    """
+    session = requests.Session()
+    page_ids = {}
+    page_rows = {}
+    last_page = max_pages
+    to_fetch = range(1, max_pages + 1)
+
+    try:
+        for round_number in range(0, max_rounds + 1):
+            if round_number:
+                print(f"Verification round {round_number}/{max_rounds}: {len(to_fetch)} pages")
+            fetched, failed_pages, end = fetch_listing_pages(session, to_fetch, delay, base_url)
+
+            fetched_ids = {page: [row['Company Id'] for row in rows] for page, rows in fetched.items()}
+            reread = [page for page in fetched_ids if page in page_ids]
+            drifted = changed_pages({page: page_ids[page] for page in reread},
+                                    {page: fetched_ids[page] for page in reread})
+            drift_from = drifted[0] if drifted else None
+
+            unconfirmed = set(failed_pages) | {page for page in fetched_ids if page not in page_ids}
+            page_ids.update(fetched_ids)
+            page_rows.update(fetched)
+
+            if end is not None:
+                if end <= last_page and end in page_ids:
+                    # The listing got shorter
+                    drift_from = min(drift_from or end, end)
+                last_page = end - 1
+                for page in [page for page in page_ids if page > last_page]:
+                    del page_ids[page], page_rows[page]
+                unconfirmed = {page for page in unconfirmed if page <= last_page}
+
+            if drift_from is not None:
+                print(f"Pagination drift detected from page {drift_from}")
+                unconfirmed.update(range(drift_from, max_pages + 1))
+
+                # The change itself may sit on an earlier page that was read
+                # just before it happened; walk back until a page is unchanged
+                for page in range(drift_from - 1, 0, -1):
+                    rows, failed, _ = fetch_listing_pages(session, [page], delay, base_url)
+                    if failed or page not in rows:
+                        unconfirmed.add(page)
+                        continue
+                    ids = [row['Company Id'] for row in rows[page]]
+                    if ids == page_ids.get(page):
+                        break
+                    print(f"  Page {page} shifted as well")
+                    page_ids[page], page_rows[page] = ids, rows[page]
+                    unconfirmed.add(page)
+            elif end is None and to_fetch and max(to_fetch) == last_page < max_pages:
+                # The listing grew past the last page read
+                unconfirmed.add(last_page + 1)
+
+            to_fetch = sorted(unconfirmed)
+            if not to_fetch:
+                break
+        else:
+            if any(page not in page_ids for page in to_fetch if page <= last_page):
+                print(f"ERROR: listing pages still failing after {max_rounds} rounds, not saving a snapshot")
+            else:
+                print(f"ERROR: listing did not settle within {max_rounds} rounds, not saving a snapshot")
+            return None
+    finally:
+        session.close()
+
+    companies = []
+    seen_company_ids = set()
+    for page in sorted(page_rows):
+        for row in page_rows[page]:
+            if row['Company Id'] in seen_company_ids:
+                continue
+            seen_company_ids.add(row['Company Id'])
+            companies.append(row)
+
+    print(f"Listing snapshot: {len(companies)} unique companies from {len(page_rows)} pages")
+    return companies
+
+
+def _snapshot_versions(master_dir):
+    versions = []
+    for path in glob.glob(os.path.join(master_dir, 'master_v*.csv')):
+        match = re.search(r'master_v(\d+)\.csv$', path)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def load_master(master_dir="company_master", version=None):
+    """Load a company master snapshot (latest by default) as a list of dictionaries"""
+    versions = _snapshot_versions(master_dir)
+    if not versions:
+        return []
+    version = version or versions[-1]
+
+    with open(os.path.join(master_dir, f"master_v{version}.csv"), 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def diff_masters(previous, current):
+    """Companies added to and removed from the listing between two snapshots"""
+    previous_ids = {row['Company Id'] for row in previous}
+    current_ids = {row['Company Id'] for row in current}
+
+    return {
+        'added': [row for row in current if row['Company Id'] not in previous_ids],
+        'removed': [row for row in previous if row['Company Id'] not in current_ids],
+    }
+
+
+def save_master_snapshot(companies, master_dir="company_master"):
+    """
+    Save a new versioned company master and its diff against the previous one
+
+    Writes master_v<N>.csv and diff_v<N>.json in master_dir.
+
+    Returns:
+        (version, diff)
+    """
+    os.makedirs(master_dir, exist_ok=True)
+
+    versions = _snapshot_versions(master_dir)
+    previous = load_master(master_dir, versions[-1]) if versions else []
+    version = versions[-1] + 1 if versions else 1
+
+    master_path = os.path.join(master_dir, f"master_v{version}.csv")
+    with open(master_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MASTER_FIELDS)
+        writer.writeheader()
+        for row in companies:
+            writer.writerow({field: row[field] for field in MASTER_FIELDS})
+
+    diff = diff_masters(previous, companies)
+    with open(os.path.join(master_dir, f"diff_v{version}.json"), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': version,
+            'previous_version': versions[-1] if versions else None,
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total': len(companies),
+            **diff,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"Company master v{version} saved to {master_path}")
+    print(f"  Added: {len(diff['added'])}, Removed: {len(diff['removed'])}")
+    return version, diff
+
+
+def save_changed_companies_csv(diff, filename="changed_companies.csv"):
+    """Write the added companies of a diff in the listing CSV format used by run_universe"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['S.No'] + MASTER_FIELDS)
+        writer.writeheader()
+        for i, row in enumerate(diff['added'], 1):
+            writer.writerow({'S.No': i, **{field: row[field] for field in MASTER_FIELDS}})
+
+    print(f"{len(diff['added'])} changed companies saved to {filename}")
+
+
+if __name__ == "__main__":
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 198
+
+    companies = crawl_listing_snapshot(max_pages=max_pages)
+    if companies:
+        version, diff = save_master_snapshot(companies)
+        save_changed_companies_csv(diff)
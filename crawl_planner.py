@@ -0,0 +1,276 @@
+import csv
+import json
+import os
+import statistics
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+
+from retry_queue import is_retryable_status
+from shareholding_breakdowns import BREAKDOWN_URL, _cache_path
+from url_resolver import RESOLVER_CACHE_FILE, SKIP_LIST_FILE, load_resolver_cache, record_resolution
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+PROBE_CACHE_FILE = "head_probe_cache.jsonl"
+
+# Size assumptions for requests that are not probed
+COMPANY_PAGE_BYTES = 250 * 1024
+BREAKDOWN_BYTES = 5 * 1024
+
+# Kinds of work fetched by the download functions in main.py
+DOCUMENT_KINDS = ('annual_report', 'credit_rating', 'concall')
+
+_thread_local = threading.local()
+
+
+def _session():
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+        _thread_local.session.headers.update(HEADERS)
+    return _thread_local.session
+
+
+def iter_document_urls(universe_file="universe_data.jsonl"):
+    """Yield (kind, url) for every document linked from the run_universe output"""
+    with open(universe_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for report in record.get('annual_reports') or []:
+                yield 'annual_report', report['url']
+            for rating in record.get('credit_ratings') or []:
+                yield 'credit_rating', rating['url']
+            for concall in record.get('concalls') or []:
+                for file_type in ('transcript', 'notes', 'ppt'):
+                    if concall.get(file_type):
+                        yield 'concall', concall[file_type]
+
+
+def probe_size(url, timeout=15):
+    """HEAD a URL, following redirects; returns a probe cache entry"""
+    response = _session().head(url, allow_redirects=True, timeout=timeout)
+    response.raise_for_status()
+    length = response.headers.get('Content-Length')
+    return {
+        'url': url,
+        'final_url': response.url,
+        'content_type': response.headers.get('Content-Type'),
+        'size': int(length) if length and length.isdigit() else None,
+        'probed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def probe_sizes(urls, max_workers=16, cache_file=PROBE_CACHE_FILE):
+    """
+    Probe many URLs concurrently, skipping those already in the probe cache
+
+    Probes the server refused (a non-retryable 4xx) are cached with size
+    None and not repeated; network errors, 429 and 5xx responses are left
+    out of the cache so the next plan probes them again.
+
+    Returns:
+        Dictionary of url -> probe entry (size None if the server gave none)
+    """
+    cache = load_resolver_cache(cache_file)
+    pending = [url for url in set(urls) if url not in cache]
+    print(f"Probing {len(pending)} URLs ({len(cache)} cached)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(probe_size, url): url for url in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                entry = future.result()
+            except requests.RequestException as e:
+                print(f"  Probe failed for {url}: {e}")
+                if is_retryable_status(getattr(e.response, 'status_code', None)):
+                    continue
+                # Many exchange hosts reject HEAD outright (403/405); cache the
+                # refusal so later plans estimate these sizes without probing
+                entry = {
+                    'url': url,
+                    'final_url': None,
+                    'content_type': None,
+                    'size': None,
+                    'error': str(e),
+                    'probed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                }
+            record_resolution(cache, entry, cache_file)
+            if done % 500 == 0:
+                print(f"  Probed {done}/{len(pending)}")
+
+    return cache
+
+
+def plan_crawl(companies_csv="all_bse_companies.csv", universe_file="universe_data.jsonl",
+               max_document_mb=100, bandwidth_mbps=50, request_latency=0.5, probe_workers=16,
+               fetch_concurrency=8, fetch_delay=0.5, breakdown_workers=4, download_delay=1,
+               probe_cache_file=PROBE_CACHE_FILE, resolver_cache_file=RESOLVER_CACHE_FILE,
+               skip_list_file=SKIP_LIST_FILE, breakdown_cache_dir="breakdown_cache"):
+    """
+    Project the cost of a universe crawl without downloading anything
+
+    Pending work is one page request per company in companies_csv, one
+    breakdown request per expandable shareholding category not already in
+    breakdown_cache_dir for the latest period on the company page, and
+    every document linked from universe_file that the resolver cache does
+    not already have on disk. Document sizes come from the resolver cache
+    or a HEAD probe; unknown sizes use the median of known sizes of the
+    same kind.
+
+    Wall time follows the run modes that do the work, one after another,
+    with the same settings as their defaults:
+      - company pages: run_pipeline, fetch_concurrency fetchers each waiting
+        fetch_delay seconds between pages
+      - breakdowns: fetch_universe_breakdowns with breakdown_workers threads
+      - documents: the download functions in main.py, one at a time with
+        download_delay seconds between files
+    Each request costs request_latency seconds plus its transfer time at
+    bandwidth_mbps, and concurrent requests share that bandwidth.
+
+    Documents above max_document_mb are written to skip_list_file, which
+    the download functions honour.
+
+    Returns:
+        The plan dictionary, also saved to crawl_plan.json
+    """
+    work = []  # (kind, url, size in bytes)
+
+    if os.path.exists(companies_csv):
+        with open(companies_csv, 'r', newline='', encoding='utf-8') as f:
+            for company in csv.DictReader(f):
+                work.append(('company_page', company['Url'], COMPANY_PAGE_BYTES))
+
+    resolved = load_resolver_cache(resolver_cache_file)
+    breakdown_urls = {}
+    documents = []
+    if os.path.exists(universe_file):
+        with open(universe_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                drilldowns = record.get('shareholding_drilldowns') or {}
+                if not drilldowns.get('company_id'):
+                    continue
+                for drilldown in drilldowns.get('drilldowns') or []:
+                    url = BREAKDOWN_URL.format(company_id=drilldowns['company_id'], **drilldown)
+                    breakdown_urls[url] = drilldown.get('as_of')
+
+        for url, as_of in sorted(breakdown_urls.items()):
+            if not as_of or not os.path.exists(_cache_path(breakdown_cache_dir, url, as_of)):
+                work.append(('breakdown', url, BREAKDOWN_BYTES))
+
+        for kind, url in iter_document_urls(universe_file):
+            entry = resolved.get(url)
+            if entry and entry.get('path') and os.path.exists(entry['path']):
+                continue
+            documents.append((kind, url))
+
+    probes = probe_sizes([url for _, url in documents], probe_workers, probe_cache_file) if documents else {}
+
+    known_sizes = {}
+    for kind, url in documents:
+        size = (resolved.get(url) or {}).get('size') or (probes.get(url) or {}).get('size')
+        if size:
+            known_sizes.setdefault(kind, []).append(size)
+    typical_size = {kind: statistics.median(sizes) for kind, sizes in known_sizes.items()}
+
+    oversized = []
+    unknown = 0
+    max_bytes = max_document_mb * 1024 * 1024
+    for kind, url in documents:
+        entry = probes.get(url) or resolved.get(url) or {}
+        size = entry.get('size')
+        if size is None:
+            unknown += 1
+            size = typical_size.get(kind, 0)
+        if size > max_bytes:
+            oversized.append({'url': url, 'kind': kind, 'size': size})
+            continue
+        work.append((kind, entry.get('final_url') or url, size))
+
+    # Kind -> (concurrency, delay between requests) of the run mode that fetches it
+    run_modes = {'company_page': (fetch_concurrency, fetch_delay), 'breakdown': (breakdown_workers, 0)}
+    run_modes.update({kind: (1, download_delay) for kind in DOCUMENT_KINDS})
+
+    bytes_per_second = bandwidth_mbps * 1024 * 1024 / 8
+    by_kind = {}
+    hosts = {}
+    for kind, url, size in work:
+        entry = by_kind.setdefault(kind, {'requests': 0, 'bytes': 0, 'request_seconds': 0.0})
+        entry['requests'] += 1
+        entry['bytes'] += size
+        entry['request_seconds'] += request_latency + run_modes[kind][1] + size / bytes_per_second
+
+        host = hosts.setdefault(urlparse(url).netloc, {'requests': 0, 'bytes': 0})
+        host['requests'] += 1
+        host['bytes'] += size
+
+    for kind, entry in by_kind.items():
+        concurrency = run_modes[kind][0]
+        entry['concurrency'] = concurrency
+        # Concurrent requests cannot together beat the link's bandwidth
+        entry['hours'] = max(entry.pop('request_seconds') / concurrency, entry['bytes'] / bytes_per_second) / 3600
+
+    total_bytes = sum(entry['bytes'] for entry in by_kind.values())
+    document_bytes = sum(entry['bytes'] for kind, entry in by_kind.items() if kind in DOCUMENT_KINDS)
+    wall_hours = sum(entry['hours'] for entry in by_kind.values())
+
+    plan = {
+        'generated_on': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_requests': len(work),
+        'total_bytes': total_bytes,
+        'disk_bytes': document_bytes,
+        'wall_hours': wall_hours,
+        'unknown_sizes': unknown,
+        'by_kind': by_kind,
+        'hosts': hosts,
+        'oversized': oversized,
+    }
+
+    with open(skip_list_file, 'w', encoding='utf-8') as f:
+        for document in oversized:
+            f.write(document['url'] + "\n")
+
+    with open('crawl_plan.json', 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+
+    print_plan(plan, max_document_mb)
+    return plan
+
+
+def print_plan(plan, max_document_mb):
+    gb = 1024 ** 3
+    print("\nCRAWL PLAN")
+    print("-" * 30)
+    print(f"Total requests      : {plan['total_requests']:,}")
+    print(f"Total download      : {plan['total_bytes'] / gb:,.2f} GB")
+    print(f"Disk needed         : {plan['disk_bytes'] / gb:,.2f} GB")
+    print(f"Projected wall time : {plan['wall_hours']:,.1f} hours")
+    print(f"Sizes estimated     : {plan['unknown_sizes']:,} documents")
+    print(f"Skipped (> {max_document_mb} MB) : {len(plan['oversized']):,} documents")
+
+    print(f"\n{'Kind':<16}{'Requests':>12}{'GB':>10}{'Conc.':>7}{'Hours':>8}")
+    for kind, entry in sorted(plan['by_kind'].items()):
+        print(f"{kind:<16}{entry['requests']:>12,}{entry['bytes'] / gb:>10.2f}"
+              f"{entry['concurrency']:>7}{entry['hours']:>8.1f}")
+
+    print(f"\n{'Host':<40}{'Requests':>10}{'GB':>10}")
+    for name, host in sorted(plan['hosts'].items(), key=lambda item: -item[1]['bytes']):
+        print(f"{name[:39]:<40}{host['requests']:>10,}{host['bytes'] / gb:>10.2f}")
+
+
+if __name__ == "__main__":
+    companies_csv = sys.argv[1] if len(sys.argv) > 1 else "all_bse_companies.csv"
+    universe_file = sys.argv[2] if len(sys.argv) > 2 else "universe_data.jsonl"
+    plan_crawl(companies_csv, universe_file)
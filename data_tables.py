@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from ratios import normalize_indian_numbers
+
+
+# Container ids of the financial tables on a Screener company page
+FINANCIAL_TABLE_IDS = (
+    'quarters',
+    'profit-loss',
+    'balance-sheet',
+    'cash-flow',
+    'ratios',
+    'quarterly-shp',
+    'yearly-shp',
+)
+
+
+def _row_label(cell):
+    """Row label of a data-table row, without the '+' of expandable rows"""
+    return ' '.join(cell.get_text(' ', strip=True).replace('+', ' ').split())
+
+
+def extract_data_tables(soup, table_ids=FINANCIAL_TABLE_IDS):
+    """
+    Extract every financial data-table on a company page in one pass
+
+    All cell strings from all tables are normalized together with a single
+    vectorized call, then split back into one array per table.
+
+    Args:
+        soup: BeautifulSoup object of a company page
+        table_ids: Container ids of the tables to keep
+
+    Returns:
+        Dictionary of table id -> {'periods': [...], 'labels': [...],
+        'values': float64 array of shape (labels, periods)}. Cells that are
+        not numbers are NaN; rows without any number (e.g. "Raw PDF") are dropped.
+    """
+    wanted = set(table_ids)
+    seen = set()
+    layouts = []
+    cells = []
+
+    for table in soup.find_all('table', class_='data-table'):
+        container = table.find_parent(id=True)
+        if not container or container['id'] not in wanted or container['id'] in seen:
+            continue
+
+        thead = table.find('thead')
+        tbody = table.find('tbody')
+        if not thead or not tbody:
+            continue
+
+        periods = [th.get_text(strip=True) for th in thead.find_all('th')][1:]
+
+        labels = []
+        for row in tbody.find_all('tr'):
+            tds = row.find_all('td')
+            if len(tds) < 2:
+                continue
+            labels.append(_row_label(tds[0]))
+            values = [td.get_text(strip=True) for td in tds[1:len(periods) + 1]]
+            # Pad short rows so every table stays rectangular
+            values += [''] * (len(periods) - len(values))
+            cells.extend(values)
+
+        seen.add(container['id'])
+        layouts.append((container['id'], periods, labels))
+
+    numbers = normalize_indian_numbers(pd.Series(cells, dtype='object')).to_numpy(dtype='float64')
+
+    tables = {}
+    offset = 0
+    for table_id, periods, labels in layouts:
+        size = len(periods) * len(labels)
+        values = numbers[offset:offset + size].reshape(len(labels), len(periods))
+        offset += size
+
+        keep = ~np.isnan(values).all(axis=1) if len(periods) else np.zeros(len(labels), dtype=bool)
+        tables[table_id] = {
+            'periods': periods,
+            'labels': [label for label, kept in zip(labels, keep) if kept],
+            'values': values[keep],
+        }
+
+    return tables
+
+
+def data_tables_to_json(tables):
+    """Convert extracted data tables to JSON-serializable lists (NaN becomes None)"""
+    serializable = {}
+    for table_id, table in tables.items():
+        values = table['values'].astype(object)
+        values[np.isnan(table['values'])] = None
+        serializable[table_id] = {
+            'periods': table['periods'],
+            'labels': table['labels'],
+            'values': values.tolist(),
+        }
+    return serializable
+
+
+def data_tables_from_json(serialized):
+    """Rebuild typed arrays from data_tables_to_json output"""
+    tables = {}
+    for table_id, table in serialized.items():
+        values = np.array(table['values'], dtype='float64')
+        tables[table_id] = {
+            'periods': table['periods'],
+            'labels': table['labels'],
+            'values': values.reshape(len(table['labels']), len(table['periods'])),
+        }
+    return tables
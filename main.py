@@ -7,52 +7,36 @@ from datetime import datetime
 import time
 from urllib.parse import urljoin
 
+from url_resolver import download_document, load_resolver_cache, load_skip_list
+
+
+def release_soup(soup):
+    """Break a parsed page's reference cycles so it is freed right away"""
+    # BeautifulSoup.decompose() stops at the root, which is not linked to
+    # its first element; decompose each top-level element first
+    for element in list(soup.contents):
+        element.decompose()
+    soup.decompose()
+
 
 def scrape_annual_reports(url="https://www.screener.in/company/505343/"):
     """Scrape annual report links from the given URL"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
-    
+
     try:
         print(f"Fetching annual reports from: {url}")
         r = requests.get(url, headers=headers)
         r.raise_for_status()
-        
+
         soup = BeautifulSoup(r.text, 'html.parser')
-        
 
-        annual_reports_section = soup.find('div', class_='documents annual-reports flex-column')
-        
-        if not annual_reports_section:
-            print("Could not find annual reports section")
-            return []
-        
+        report_links = extract_annual_reports(soup)
 
-        report_links = []
-        link_list = annual_reports_section.find('ul', class_='list-links')
-        
-        if link_list:
-            for li in link_list.find_all('li'):
-                link = li.find('a', href=True)
-                if link:
-                    href = link['href']
-                    # Get the financial year text
-                    year_text = link.get_text(strip=True).split('\n')[0].strip()
-                    
-                    # Get the source (BSE/NSE)
-                    source_div = link.find('div', class_='ink-600 smaller')
-                    source = source_div.get_text(strip=True) if source_div else 'unknown'
-                    
-                    report_links.append({
-                        'year': year_text,
-                        'url': href,
-                        'source': source
-                    })
-        
         print(f"Found {len(report_links)} annual reports")
         return report_links
-        
+
     except requests.RequestException as e:
         print(f"Error fetching the webpage: {e}")
         return []
@@ -61,51 +45,58 @@ def scrape_annual_reports(url="https://www.screener.in/company/505343/"):
         return []
 
 
+def extract_annual_reports(soup):
+    """Extract annual report links from BeautifulSoup object"""
+
+    annual_reports_section = soup.find('div', class_='documents annual-reports flex-column')
+
+    if not annual_reports_section:
+        print("Could not find annual reports section")
+        return []
+
+
+    report_links = []
+    link_list = annual_reports_section.find('ul', class_='list-links')
+
+    if link_list:
+        for li in link_list.find_all('li'):
+            link = li.find('a', href=True)
+            if link:
+                href = link['href']
+                # Get the financial year text
+                year_text = link.get_text(strip=True).split('\n')[0].strip()
+
+                # Get the source (BSE/NSE)
+                source_div = link.find('div', class_='ink-600 smaller')
+                source = source_div.get_text(strip=True) if source_div else 'unknown'
+
+                report_links.append({
+                    'year': year_text,
+                    'url': href,
+                    'source': source
+                })
+
+    return report_links
+
+
 def scrape_credit_ratings(url="https://www.screener.in/company/TATAMOTORS/consolidated/"):
     """Scrape credit rating links from the given URL"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
-    
+
     try:
         print(f"Fetching credit ratings from: {url}")
         r = requests.get(url, headers=headers)
         r.raise_for_status()
-        
-        soup = BeautifulSoup(r.text, 'html.parser')
-        
 
-        credit_ratings_section = soup.find('div', class_='documents credit-ratings flex-column')
-        
-        if not credit_ratings_section:
-            print("Could not find credit ratings section")
-            return []
-        
-
-        rating_links = []
-        link_list = credit_ratings_section.find('ul', class_='list-links')
-        
-        if link_list:
-            for li in link_list.find_all('li'):
-                link = li.find('a', href=True)
-                if link:
-                    href = link['href']
+        soup = BeautifulSoup(r.text, 'html.parser')
 
-                    rating_text = link.get_text(strip=True).split('\n')[0].strip()
-                    
+        rating_links = extract_credit_ratings(soup)
 
-                    source_div = link.find('div', class_='ink-600 smaller')
-                    date_source = source_div.get_text(strip=True) if source_div else 'unknown'
-                    
-                    rating_links.append({
-                        'title': rating_text,
-                        'url': href,
-                        'date_source': date_source
-                    })
-        
         print(f"Found {len(rating_links)} credit ratings")
         return rating_links
-        
+
     except requests.RequestException as e:
         print(f"Error fetching the webpage: {e}")
         return []
@@ -114,76 +105,58 @@ def scrape_credit_ratings(url="https://www.screener.in/company/TATAMOTORS/consol
         return []
 
 
+def extract_credit_ratings(soup):
+    """Extract credit rating links from BeautifulSoup object"""
+
+    credit_ratings_section = soup.find('div', class_='documents credit-ratings flex-column')
+
+    if not credit_ratings_section:
+        print("Could not find credit ratings section")
+        return []
+
+
+    rating_links = []
+    link_list = credit_ratings_section.find('ul', class_='list-links')
+
+    if link_list:
+        for li in link_list.find_all('li'):
+            link = li.find('a', href=True)
+            if link:
+                href = link['href']
+
+                rating_text = link.get_text(strip=True).split('\n')[0].strip()
+
+
+                source_div = link.find('div', class_='ink-600 smaller')
+                date_source = source_div.get_text(strip=True) if source_div else 'unknown'
+
+                rating_links.append({
+                    'title': rating_text,
+                    'url': href,
+                    'date_source': date_source
+                })
+
+    return rating_links
+
+
 def scrape_concalls(url="https://www.screener.in/company/TATAMOTORS/consolidated/"):
     """Scrape conference call links from the given URL"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
-    
+
     try:
         print(f"Fetching concalls from: {url}")
         r = requests.get(url, headers=headers)
         r.raise_for_status()
-        
-        soup = BeautifulSoup(r.text, 'html.parser')
-        
-
-        concalls_section = soup.find('div', class_='documents concalls flex-column')
-        
-        if not concalls_section:
-            print("Could not find concalls section")
-            return []
-        
 
-        concall_links = []
-        link_list = concalls_section.find('ul', class_='list-links')
-        
-        if link_list:
-            for li in link_list.find_all('li'):
-
-                li_text = li.get_text(strip=True)
-                
+        soup = BeautifulSoup(r.text, 'html.parser')
 
-                month_year_match = re.search(r'([A-Za-z]+)\s+(\d{4})', li_text)
-                if month_year_match:
-                    month = month_year_match.group(1)
-                    year = month_year_match.group(2)
-                    month_year = f"{month}_{year}"
-                else:
+        concall_links = extract_concalls(soup)
 
-                    month_year = "Unknown_Date"
-                
-
-                links = li.find_all('a', href=True)
-                
-                concall_data = {
-                    'month_year': month_year,
-                    'transcript': None,
-                    'notes': None,
-                    'ppt': None,
-                    'rec': None  
-                }
-                
-                for link in links:
-                    link_text = link.get_text(strip=True).lower()
-                    href = link['href']
-                    
-                    if 'transcript' in link_text:
-                        concall_data['transcript'] = href
-                    elif 'notes' in link_text:
-                        concall_data['notes'] = href
-                    elif 'ppt' in link_text:
-                        concall_data['ppt'] = href
-                    elif 'rec' in link_text:
-                        concall_data['rec'] = href 
-                
-        
-                if concall_data['transcript'] or concall_data['notes'] or concall_data['ppt']:
-                    concall_links.append(concall_data)
-        
         print(f"Found {len(concall_links)} concall entries")
         return concall_links
-        
+
     except requests.RequestException as e:
         print(f"Error fetching the webpage: {e}")
         return []
@@ -192,6 +165,65 @@ def scrape_concalls(url="https://www.screener.in/company/TATAMOTORS/consolidated
         return []
 
 
+def extract_concalls(soup):
+    """Extract conference call links from BeautifulSoup object"""
+
+    concalls_section = soup.find('div', class_='documents concalls flex-column')
+
+    if not concalls_section:
+        print("Could not find concalls section")
+        return []
+
+
+    concall_links = []
+    link_list = concalls_section.find('ul', class_='list-links')
+
+    if link_list:
+        for li in link_list.find_all('li'):
+
+            li_text = li.get_text(strip=True)
+
+
+            month_year_match = re.search(r'([A-Za-z]+)\s+(\d{4})', li_text)
+            if month_year_match:
+                month = month_year_match.group(1)
+                year = month_year_match.group(2)
+                month_year = f"{month}_{year}"
+            else:
+
+                month_year = "Unknown_Date"
+
+
+            links = li.find_all('a', href=True)
+
+            concall_data = {
+                'month_year': month_year,
+                'transcript': None,
+                'notes': None,
+                'ppt': None,
+                'rec': None
+            }
+
+            for link in links:
+                link_text = link.get_text(strip=True).lower()
+                href = link['href']
+
+                if 'transcript' in link_text:
+                    concall_data['transcript'] = href
+                elif 'notes' in link_text:
+                    concall_data['notes'] = href
+                elif 'ppt' in link_text:
+                    concall_data['ppt'] = href
+                elif 'rec' in link_text:
+                    concall_data['rec'] = href
+
+
+            if concall_data['transcript'] or concall_data['notes'] or concall_data['ppt']:
+                concall_links.append(concall_data)
+
+    return concall_links
+
+
 def download_concalls(concall_links, base_download_dir="Concalls"):
     """Download all concall documents to the specified directory structure"""
     if not concall_links:
@@ -202,6 +234,9 @@ def download_concalls(concall_links, base_download_dir="Concalls"):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    resolver_cache = load_resolver_cache()
+    skip_urls = load_skip_list()
+    
     successful_downloads = 0
     failed_downloads = 0
     
@@ -224,6 +259,9 @@ def download_concalls(concall_links, base_download_dir="Concalls"):
         for file_type in file_types:
             url = concall.get(file_type)
             if url:
+                if url in skip_urls:
+                    print(f"  Skipping oversized {file_type}")
+                    continue
                 try:
                     print(f"  Downloading {file_type}...")
                     
@@ -237,25 +275,18 @@ def download_concalls(concall_links, base_download_dir="Concalls"):
                     else:
                         file_extension = '.pdf'
                     
-                    filename = f"{file_type}{file_extension}"
-                    filepath = os.path.join(month_dir, filename)
+                    # The guessed extension is only used when the real type
+                    # cannot be sniffed from the downloaded bytes
+                    filepath, downloaded = download_document(url, month_dir, file_type, headers,
+                                                             resolver_cache, file_extension)
+                    filename = os.path.basename(filepath)
                     
                     # Skip if file already exists
-                    if os.path.exists(filepath):
+                    if not downloaded:
                         print(f"    File already exists: {filename}")
                         successful_downloads += 1
                         continue
                     
-
-                    response = requests.get(url, headers=headers, stream=True, timeout=30)
-                    response.raise_for_status()
-                    
-
-                    with open(filepath, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
                     file_size = os.path.getsize(filepath)
                     print(f"    Downloaded: {filename} ({file_size:,} bytes)")
                     successful_downloads += 1
@@ -291,6 +322,9 @@ def download_credit_ratings(rating_links, download_dir="credit_ratings"):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    resolver_cache = load_resolver_cache()
+    skip_urls = load_skip_list()
+    
     successful_downloads = 0
     failed_downloads = 0
     
@@ -300,6 +334,10 @@ def download_credit_ratings(rating_links, download_dir="credit_ratings"):
             url = rating['url']
             date_source = rating['date_source']
             
+            if url in skip_urls:
+                print(f"[{i}/{len(rating_links)}] Skipping oversized: {title} - {date_source}")
+                continue
+            
             print(f"[{i}/{len(rating_links)}] Downloading: {title} - {date_source}")
             
 
@@ -324,25 +362,18 @@ def download_credit_ratings(rating_links, download_dir="credit_ratings"):
                 else:
                     file_extension = '.html'
             
-            filename = f"{safe_date_source}_rating{file_extension}"
-            filepath = os.path.join(download_dir, filename)
+            # The guessed extension is only used when the real type
+            # cannot be sniffed from the downloaded bytes
+            filepath, downloaded = download_document(url, download_dir, f"{safe_date_source}_rating", headers,
+                                                     resolver_cache, file_extension)
+            filename = os.path.basename(filepath)
             
 
-            if os.path.exists(filepath):
+            if not downloaded:
                 print(f"  File already exists: {filename}")
                 successful_downloads += 1
                 continue
             
-
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
-            response.raise_for_status()
-            
-
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
             file_size = os.path.getsize(filepath)
             print(f"  Downloaded: {filename} ({file_size:,} bytes)")
             successful_downloads += 1
@@ -377,6 +408,9 @@ def download_annual_reports(report_links, download_dir="annual_reports"):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    resolver_cache = load_resolver_cache()
+    skip_urls = load_skip_list()
+    
     successful_downloads = 0
     failed_downloads = 0
     
@@ -386,6 +420,10 @@ def download_annual_reports(report_links, download_dir="annual_reports"):
             url = report['url']
             source = report['source']
             
+            if url in skip_urls:
+                print(f"[{i}/{len(report_links)}] Skipping oversized: {year} from {source}")
+                continue
+            
             print(f"[{i}/{len(report_links)}] Downloading: {year} from {source}")
             
 
@@ -400,25 +438,18 @@ def download_annual_reports(report_links, download_dir="annual_reports"):
             else:
                 file_extension = '.pdf'
             
-            filename = f"{safe_year}_{source}{file_extension}"
-            filepath = os.path.join(download_dir, filename)
+            # The guessed extension is only used when the real type
+            # cannot be sniffed from the downloaded bytes
+            filepath, downloaded = download_document(url, download_dir, f"{safe_year}_{source}", headers,
+                                                     resolver_cache, file_extension)
+            filename = os.path.basename(filepath)
             
 
-            if os.path.exists(filepath):
+            if not downloaded:
                 print(f"  File already exists: {filename}")
                 successful_downloads += 1
                 continue
             
-
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
-            response.raise_for_status()
-            
-
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
             file_size = os.path.getsize(filepath)
             print(f"  Downloaded: {filename} ({file_size:,} bytes)")
             successful_downloads += 1
@@ -465,6 +496,28 @@ def scrape_shareholding_data():
         return None
 
 
+def extract_top_ratios(soup):
+    """Extract the raw top ratios (Market Cap, High / Low, ROCE, ...) from BeautifulSoup object"""
+
+    ratios_list = soup.find('ul', id='top-ratios')
+
+    if not ratios_list:
+        print("Could not find the top ratios section")
+        return {}
+
+    top_ratios = {}
+    for li in ratios_list.find_all('li'):
+        name_span = li.find('span', class_='name')
+        value_span = li.find('span', class_='value')
+        if name_span and value_span:
+            name = name_span.get_text(strip=True)
+            # Keep the raw text, e.g. "₹ 2,64,873 Cr." or "₹ 1,179 / 536"
+            value = ' '.join(value_span.get_text(' ', strip=True).split())
+            top_ratios[name] = value
+
+    return top_ratios
+
+
 def extract_shareholding_data(soup):
     """Extract shareholding pattern data from BeautifulSoup object"""
 
@@ -612,80 +665,97 @@ def analyze_shareholding_trends(df):
     return trend_analysis
 
 
-def save_shareholding_data_to_txt(shareholding_data, filename="tata_motors_shareholding.txt"):
-    """Save shareholding data to a text file"""
-    if not shareholding_data:
-        print("No shareholding data to save")
-        return False
-    
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
+def render_shareholding_report(shareholding_data, trends=None, company_name="TATA MOTORS",
+                               source="Screener.in (TATAMOTORS/consolidated)", generated_on=None):
+    """Render the shareholding text report into a single string"""
+    generated_on = generated_on or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    lines = []
 
-            f.write("TATA MOTORS COMPLETE FINANCIAL DATA\n")
-            f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("Source: Screener.in (TATAMOTORS/consolidated)\n\n")
-            
+    lines.append(f"{company_name.upper()} COMPLETE FINANCIAL DATA\n")
+    lines.append(f"Generated on: {generated_on}\n")
+    lines.append(f"Source: {source}\n\n")
 
-            f.write("SHAREHOLDING PATTERN\n")
-            f.write("-" * 30 + "\n")
-            
 
-            first_category = list(shareholding_data.keys())[0]
-            quarters = list(shareholding_data[first_category].keys())
-            
+    lines.append("SHAREHOLDING PATTERN\n")
+    lines.append("-" * 30 + "\n")
 
-            f.write(f"{'Category':<15}")
-            for quarter in quarters:
-                f.write(f"{quarter:>12}")
-            f.write("\n")
-            
 
-            f.write("-" * (15 + 12 * len(quarters)) + "\n")
-            
+    first_category = list(shareholding_data.keys())[0]
+    quarters = list(shareholding_data[first_category].keys())
 
-            for category, quarterly_data in shareholding_data.items():
-                f.write(f"{category:<15}")
-                for quarter in quarters:
-                    value = quarterly_data.get(quarter, "N/A")
-                    f.write(f"{value:>12}")
-                f.write("\n")
-            f.write("\n")
-            
-            # Trend Analysis
+
+    lines.append(f"{'Category':<15}")
+    for quarter in quarters:
+        lines.append(f"{quarter:>12}")
+    lines.append("\n")
+
+
+    lines.append("-" * (15 + 12 * len(quarters)) + "\n")
+
+
+    for category, quarterly_data in shareholding_data.items():
+        lines.append(f"{category:<15}")
+        for quarter in quarters:
+            value = quarterly_data.get(quarter, "N/A")
+            lines.append(f"{value:>12}")
+        lines.append("\n")
+    lines.append("\n")
+
+    # Trend Analysis
+    if trends and 'period' in trends:
+        lines.append("SHAREHOLDING TREND ANALYSIS\n")
+        lines.append("-" * 30 + "\n")
+        lines.append(f"Period: {trends['period']}\n\n")
+
+        lines.append("Changes:\n")
+        for category, change_data in trends['changes'].items():
+            if 'error' not in change_data:
+                change = change_data['change']
+                from_val = change_data['from']
+                to_val = change_data['to']
+                lines.append(f"{category:<15}: {change:+6.2f}% ({from_val:.2f}% → {to_val:.2f}%)\n")
+
+        # Shareholder count
+        if 'shareholder_change' in trends and 'error' not in trends['shareholder_change']:
+            sh_change = trends['shareholder_change']
+            lines.append(f"\nShareholder Count Change: {sh_change['absolute']:+,} ({sh_change['percentage']:+.1f}%)\n")
+            lines.append(f"From: {sh_change['from']:,} → To: {sh_change['to']:,}\n")
+
+
+    lines.append("\nKEY OBSERVATIONS\n")
+    lines.append("-" * 30 + "\n")
+    lines.append("1. Financial metrics show company performance\n")
+    lines.append("2. Shareholding pattern indicates investor sentiment\n")
+    lines.append("3. FII/DII movements suggest institutional interest\n")
+    lines.append("4. Promoter holding changes reflect management decisions\n")
+    lines.append("5. Retail participation shows market accessibility\n")
+
+    return ''.join(lines)
+
+
+def save_shareholding_data_to_txt(shareholding_data, filename="tata_motors_shareholding.txt", trends=None,
+                                  company_name="TATA MOTORS", source="Screener.in (TATAMOTORS/consolidated)"):
+    """Save shareholding data to a text file"""
+    if not shareholding_data:
+        print("No shareholding data to save")
+        return False
+
+    try:
+        # Callers that already analysed the data pass trends in to avoid
+        # rebuilding the DataFrame here
+        if trends is None:
             df = create_shareholding_dataframe(shareholding_data)
             if df is not None:
                 trends = analyze_shareholding_trends(df)
-                if trends:
-                    f.write("SHAREHOLDING TREND ANALYSIS\n")
-                    f.write("-" * 30 + "\n")
-                    f.write(f"Period: {trends['period']}\n\n")
-                    
-                    f.write("Changes:\n")
-                    for category, change_data in trends['changes'].items():
-                        if 'error' not in change_data:
-                            change = change_data['change']
-                            from_val = change_data['from']
-                            to_val = change_data['to']
-                            f.write(f"{category:<15}: {change:+6.2f}% ({from_val:.2f}% → {to_val:.2f}%)\n")
-                    
-                    # Shareholder count
-                    if 'shareholder_change' in trends and 'error' not in trends['shareholder_change']:
-                        sh_change = trends['shareholder_change']
-                        f.write(f"\nShareholder Count Change: {sh_change['absolute']:+,} ({sh_change['percentage']:+.1f}%)\n")
-                        f.write(f"From: {sh_change['from']:,} → To: {sh_change['to']:,}\n")
-            
 
-            f.write("\nKEY OBSERVATIONS\n")
-            f.write("-" * 30 + "\n")
-            f.write("1. Financial metrics show company performance\n")
-            f.write("2. Shareholding pattern indicates investor sentiment\n")
-            f.write("3. FII/DII movements suggest institutional interest\n")
-            f.write("4. Promoter holding changes reflect management decisions\n")
-            f.write("5. Retail participation shows market accessibility\n")
-        
+        report = render_shareholding_report(shareholding_data, trends, company_name, source)
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(report)
+
         print(f"Shareholding data successfully saved to {filename}")
         return True
-        
+
     except Exception as e:
         print(f"Error saving to text file: {e}")
         return False
@@ -0,0 +1,309 @@
+import csv
+import gc
+import json
+import os
+import resource
+import sys
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+from data_tables import data_tables_to_json, extract_data_tables
+from main import (
+    extract_annual_reports,
+    extract_concalls,
+    extract_credit_ratings,
+    extract_shareholding_data,
+    extract_top_ratios,
+    release_soup,
+)
+from retry_queue import ItemOutcome, RetryQueue, Status, is_retryable_status, replay_dead_letters
+from section_cache import MISS, SectionCache, content_hash
+from shareholding_breakdowns import extract_shareholding_drilldowns
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def iter_companies(companies_csv="all_bse_companies.csv"):
+    """Yield company rows from the listing CSV without loading the whole file"""
+    with open(companies_csv, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def extract_financial_tables(soup):
+    """Extract the financial data-tables in JSON-serializable form"""
+    return data_tables_to_json(extract_data_tables(soup))
+
+
+# Section name -> (extractor, version). Bump a version whenever its
+# extractor's output changes so cached results for that section are redone.
+SECTION_EXTRACTORS = {
+    'top_ratios': (extract_top_ratios, 1),
+    'shareholding': (extract_shareholding_data, 1),
+    'shareholding_drilldowns': (extract_shareholding_drilldowns, 2),
+    'annual_reports': (extract_annual_reports, 1),
+    'credit_ratings': (extract_credit_ratings, 1),
+    'concalls': (extract_concalls, 1),
+    'financial_tables': (extract_financial_tables, 1),
+}
+
+
+def open_section_cache(cache_dir):
+    """Open the section cache, dropping entries of extractor versions no longer in use"""
+    cache = SectionCache(cache_dir)
+    cache.purge_stale_versions({name: version for name, (_, version) in SECTION_EXTRACTORS.items()})
+    return cache
+
+
+def extract_sections(soup, sections=None):
+    """Extract every section (or only the given ones) from a parsed company page"""
+    names = sections or SECTION_EXTRACTORS.keys()
+    return {name: SECTION_EXTRACTORS[name][0](soup) for name in names}
+
+
+def extract_company_sections(page_content, cache=None):
+    """
+    Parse one company page and extract every section from a single tree
+
+    With a SectionCache, sections already extracted from identical page
+    content by the current extractor version are read from the cache; the
+    page is only parsed if at least one section is missing.
+    """
+    results = {}
+    page_hash = None
+
+    if cache is not None:
+        page_hash = content_hash(page_content)
+        for name, (_, version) in SECTION_EXTRACTORS.items():
+            value = cache.get(name, version, page_hash)
+            if value is not MISS:
+                results[name] = value
+
+    missing = [name for name in SECTION_EXTRACTORS if name not in results]
+    if missing:
+        soup = BeautifulSoup(page_content, 'html.parser')
+        try:
+            extracted = extract_sections(soup, missing)
+        finally:
+            # Break the tree's parent/child cycles so it is freed right away
+            # instead of waiting for the cyclic garbage collector
+            release_soup(soup)
+
+        if cache is not None:
+            for name, value in extracted.items():
+                cache.put(name, SECTION_EXTRACTORS[name][1], page_hash, value)
+        results.update(extracted)
+
+    return {name: results[name] for name in SECTION_EXTRACTORS}
+
+
+def scrape_company(url, session=None, cache=None):
+    """Fetch a company page once and extract all of its sections"""
+    getter = session or requests
+    response = getter.get(url, headers=HEADERS, timeout=30)
+    try:
+        response.raise_for_status()
+        page_content = response.content
+    finally:
+        response.close()
+
+    sections = extract_company_sections(page_content, cache)
+    del page_content, response
+    return sections
+
+
+def process_saved_pages(pages_dir, output_file="universe_data.jsonl", cache_dir="section_cache"):
+    """
+    Re-extract sections from saved company pages (*.html) without any network access
+
+    Unchanged pages are served entirely from the section cache.
+    """
+    cache = open_section_cache(cache_dir)
+    processed = 0
+
+    with open(output_file, 'w', encoding='utf-8') as out:
+        for name in sorted(os.listdir(pages_dir)):
+            if not name.endswith('.html'):
+                continue
+            with open(os.path.join(pages_dir, name), 'rb') as f:
+                page_content = f.read()
+
+            try:
+                sections = extract_company_sections(page_content, cache)
+            except Exception as e:
+                print(f"  Error parsing {name}: {e}")
+                continue
+
+            record = {'Name': os.path.splitext(name)[0], **sections}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            processed += 1
+
+    print(f"Processed {processed} saved pages ({cache.hits} cache hits, {cache.misses} misses)")
+    return processed
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KB on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def scrape_company_outcome(company, session=None, cache=None):
+    """
+    Scrape one listing row and classify the result
+
+    Network errors are retryable except for client errors other than 429,
+    which will fail the same way again, as will parse errors. A page with no
+    ratios, shareholding or financial tables is EMPTY rather than FAILED.
+    """
+    try:
+        sections = scrape_company(company['Url'], session, cache)
+    except requests.RequestException as e:
+        status_code = getattr(e.response, 'status_code', None)
+        return ItemOutcome(company, Status.FAILED, error=f"fetch error: {e}", retryable=is_retryable_status(status_code))
+    except Exception as e:
+        return ItemOutcome(company, Status.FAILED, error=f"parse error: {e}")
+
+    record = {'S.No': company['S.No'], 'Name': company['Name'], 'Url': company['Url'], **sections}
+    has_data = sections['top_ratios'] or sections['shareholding'] or sections['financial_tables']
+    return ItemOutcome(company, Status.OK if has_data else Status.EMPTY, value=record)
+
+
+def run_universe(companies_csv="all_bse_companies.csv", output_file="universe_data.jsonl",
+                 bounded_memory=True, delay=1, baseline_company=10, max_rss_growth_mb=50,
+                 max_attempts=5, dead_letter_file="dead_letters.jsonl", cache_dir=None):
+    """
+    Scrape every company in the listing CSV
+
+    With bounded_memory the result for each company is appended to
+    output_file as one JSON line as soon as it is extracted and nothing is
+    kept between companies. Peak RSS is sampled at baseline_company and at
+    the end of the run; growth above max_rss_growth_mb is reported as a
+    memory regression.
+
+    Failed companies do not hold up the main pass: they go to a retry queue
+    that is drained with exponential backoff afterwards, and companies still
+    failing after max_attempts are written to dead_letter_file (see
+    replay_failed_companies).
+
+    Args:
+        companies_csv: Listing CSV written by all_stocks_scraper.py
+        output_file: JSON lines file, one company per line
+        bounded_memory: Flush per company instead of collecting all results
+        delay: Seconds to sleep between companies
+        baseline_company: Company number at which the RSS baseline is taken
+        max_rss_growth_mb: Allowed peak RSS growth after the baseline
+        max_attempts: Attempts per company before it is dead-lettered
+        dead_letter_file: JSON lines file of companies that kept failing
+        cache_dir: Section cache directory; pages whose content has not
+            changed since they were last extracted are not parsed again
+
+    Returns:
+        Dictionary with run statistics
+    """
+    stats = {'processed': 0, 'empty': 0, 'retried': 0, 'failed': 0,
+             'baseline_rss_mb': None, 'peak_rss_mb': None}
+    collected = []
+
+    session = requests.Session()
+    cache = open_section_cache(cache_dir) if cache_dir else None
+    retry_queue = RetryQueue(max_attempts=max_attempts, dead_letter_file=dead_letter_file, kind='company')
+    out = open(output_file, 'w', encoding='utf-8') if bounded_memory else None
+
+    def write(outcome):
+        stats['processed'] += 1
+        if outcome.status is Status.EMPTY:
+            stats['empty'] += 1
+        if bounded_memory:
+            out.write(json.dumps(outcome.value, ensure_ascii=False) + "\n")
+            out.flush()
+        else:
+            collected.append(outcome.value)
+
+    try:
+        for i, company in enumerate(iter_companies(companies_csv), 1):
+            print(f"[{i}] Scraping {company['Name']}: {company['Url']}")
+
+            outcome = scrape_company_outcome(company, session, cache)
+            if outcome.ok:
+                write(outcome)
+            else:
+                print(f"  Failed {company['Name']}: {outcome.error}")
+                retry_queue.push(outcome)
+            del outcome
+
+            if i == baseline_company:
+                gc.collect()
+                stats['baseline_rss_mb'] = peak_rss_mb()
+                print(f"  Baseline peak RSS: {stats['baseline_rss_mb']:.1f} MB")
+
+            time.sleep(delay)
+
+        if len(retry_queue):
+            print(f"\nRetrying {len(retry_queue)} failed companies...")
+        for outcome in retry_queue.drain(lambda company: scrape_company_outcome(company, session, cache)):
+            stats['retried'] += 1
+            write(outcome)
+    finally:
+        session.close()
+        if out:
+            out.close()
+
+    if not bounded_memory:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for record in collected:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    stats['failed'] = retry_queue.dead_lettered
+    stats['peak_rss_mb'] = peak_rss_mb()
+    print(f"\nUniverse run complete: {stats['processed']} processed "
+          f"({stats['empty']} without data, {stats['retried']} after retry)")
+    print(f"Dead-lettered to {dead_letter_file}: {stats['failed']}")
+    print(f"Peak RSS: {stats['peak_rss_mb']:.1f} MB")
+
+    if stats['baseline_rss_mb'] is not None:
+        growth = stats['peak_rss_mb'] - stats['baseline_rss_mb']
+        print(f"Peak RSS growth since company {baseline_company}: {growth:+.1f} MB")
+        if bounded_memory and growth > max_rss_growth_mb:
+            print(f"WARNING: peak RSS grew by more than {max_rss_growth_mb} MB, possible memory regression")
+
+    return stats
+
+
+def replay_failed_companies(output_file="universe_data.jsonl", dead_letter_file="dead_letters.jsonl", max_attempts=5):
+    """Re-scrape dead-lettered companies and append the successes to output_file"""
+    session = requests.Session()
+    replayed = 0
+    try:
+        with open(output_file, 'a', encoding='utf-8') as out:
+            for outcome in replay_dead_letters(lambda company: scrape_company_outcome(company, session),
+                                               'company', dead_letter_file, max_attempts):
+                out.write(json.dumps(outcome.value, ensure_ascii=False) + "\n")
+                out.flush()
+                replayed += 1
+    finally:
+        session.close()
+
+    print(f"Replayed {replayed} companies into {output_file}")
+    return replayed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--replay':
+        replay_failed_companies()
+        sys.exit(0)
+
+    companies_csv = sys.argv[1] if len(sys.argv) > 1 else "all_bse_companies.csv"
+    if not os.path.exists(companies_csv):
+        print(f"Companies file not found: {companies_csv}")
+        sys.exit(1)
+
+    run_universe(companies_csv)
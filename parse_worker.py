@@ -0,0 +1,27 @@
+"""
+Parse-side entry points for the process pool in pipeline.py
+
+This module deliberately imports nothing heavy at load time so the fetch
+process can reference these functions without importing BeautifulSoup or
+pandas; worker processes import them once in init_worker.
+"""
+
+_section_cache = None
+
+
+def init_worker(cache_dir=None):
+    """Import the parsing stack once per worker process and open the section cache"""
+    global _section_cache
+    import main_executor  # noqa: F401
+
+    if cache_dir:
+        from section_cache import SectionCache
+        _section_cache = SectionCache(cache_dir)
+
+
+def parse_company_page(company, page_content):
+    """Parse one company page into the same record run_universe writes"""
+    from main_executor import extract_company_sections
+
+    sections = extract_company_sections(page_content, _section_cache)
+    return {'S.No': company.get('S.No'), 'Name': company['Name'], 'Url': company['Url'], **sections}
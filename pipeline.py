@@ -0,0 +1,166 @@
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from parse_worker import init_worker, parse_company_page
+from retry_queue import ItemOutcome, RetryQueue, Status, is_retryable_status
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+async def _produce_companies(companies_csv, companies_queue, fetch_concurrency):
+    """Feed listing rows to the fetchers, then one stop marker per fetcher"""
+    with open(companies_csv, 'r', newline='', encoding='utf-8') as f:
+        for company in csv.DictReader(f):
+            await companies_queue.put(company)
+
+    for _ in range(fetch_concurrency):
+        await companies_queue.put(None)
+
+
+async def _fetch_page_outcome(session, company):
+    """Download one company page; classified like scrape_company_outcome"""
+    try:
+        async with session.get(company['Url']) as response:
+            response.raise_for_status()
+            page_content = await response.read()
+    except aiohttp.ClientResponseError as e:
+        return ItemOutcome(company, Status.FAILED, error=f"fetch error: {e}", retryable=is_retryable_status(e.status))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return ItemOutcome(company, Status.FAILED, error=f"fetch error: {e}", retryable=True)
+
+    return ItemOutcome(company, Status.OK, value=page_content)
+
+
+async def _fetch_worker(session, companies_queue, pages_queue, failures, stats, delay):
+    """Network-only worker: download company pages and queue the raw bytes"""
+    while True:
+        company = await companies_queue.get()
+        if company is None:
+            return
+
+        outcome = await _fetch_page_outcome(session, company)
+        if not outcome.ok:
+            print(f"  Error fetching {company['Name']}: {outcome.error}")
+            stats['fetch_failed'] += 1
+            # Retried with backoff once the main pass is done, so failures
+            # do not slow it down
+            failures.push(outcome)
+            continue
+
+        stats['fetched'] += 1
+        # Blocks when the parse side falls behind, which throttles fetching
+        await pages_queue.put((company, outcome.value))
+        del outcome
+
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def _parse_worker(loop, executor, pages_queue, out, failures, stats):
+    """Hand queued pages to the process pool and write each result as it completes"""
+    while True:
+        item = await pages_queue.get()
+        if item is None:
+            return
+
+        company, page_content = item
+        try:
+            record = await loop.run_in_executor(executor, parse_company_page, company, page_content)
+        except Exception as e:
+            print(f"  Error parsing {company['Name']}: {e}")
+            stats['parse_failed'] += 1
+            failures.push(ItemOutcome(company, Status.FAILED, error=f"parse error: {e}"))
+            continue
+        finally:
+            del page_content, item
+
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        stats['parsed'] += 1
+
+        if stats['parsed'] % 100 == 0:
+            print(f"Parsed {stats['parsed']} companies ({stats['fetched']} fetched)")
+
+
+async def run_pipeline(companies_csv="all_bse_companies.csv", output_file="universe_data.jsonl",
+                       fetch_concurrency=8, parse_workers=None, queue_size=64, delay=0.5, timeout=30,
+                       max_attempts=5, dead_letter_file="dead_letters.jsonl", cache_dir=None):
+    """
+    Scrape the universe with separate fetch and parse stages
+
+    fetch_concurrency asyncio tasks do only network I/O and put raw page
+    bytes on a queue holding at most queue_size pages. parse_workers
+    processes (default: CPU count) take pages off the queue, parse them
+    with BeautifulSoup and extract the sections. Each side can be scaled
+    without touching the other. Failed fetches are retried with backoff
+    after the main pass, using the same retry rules as run_universe;
+    companies that keep failing, or fail to parse, are written to
+    dead_letter_file for replay. With cache_dir, parse workers share the
+    section cache and skip parsing pages that have not changed.
+
+    Returns:
+        Dictionary with run statistics
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    stats = {'fetched': 0, 'fetch_failed': 0, 'retried': 0, 'parsed': 0, 'parse_failed': 0}
+    started = time.time()
+
+    loop = asyncio.get_running_loop()
+    companies_queue = asyncio.Queue(maxsize=fetch_concurrency * 2)
+    pages_queue = asyncio.Queue(maxsize=queue_size)
+    failures = RetryQueue(max_attempts=max_attempts, dead_letter_file=dead_letter_file, kind='company')
+
+    connector = aiohttp.TCPConnector(limit=fetch_concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    with ProcessPoolExecutor(max_workers=parse_workers, initializer=init_worker, initargs=(cache_dir,)) as executor, \
+            open(output_file, 'w', encoding='utf-8') as out:
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=client_timeout) as session:
+            parsers = [
+                asyncio.create_task(_parse_worker(loop, executor, pages_queue, out, failures, stats))
+                for _ in range(parse_workers)
+            ]
+            fetchers = [
+                asyncio.create_task(_fetch_worker(session, companies_queue, pages_queue, failures, stats, delay))
+                for _ in range(fetch_concurrency)
+            ]
+
+            await _produce_companies(companies_csv, companies_queue, fetch_concurrency)
+            await asyncio.gather(*fetchers)
+
+            if len(failures):
+                print(f"\nRetrying {len(failures)} failed fetches...")
+            async for outcome in failures.drain_async(lambda company: _fetch_page_outcome(session, company)):
+                stats['fetched'] += 1
+                stats['retried'] += 1
+                await pages_queue.put((outcome.item, outcome.value))
+
+            for _ in parsers:
+                await pages_queue.put(None)
+            await asyncio.gather(*parsers)
+
+    elapsed = time.time() - started
+    print(f"\nPipeline complete in {elapsed:.1f}s")
+    print(f"  Fetched: {stats['fetched']} ({stats['fetch_failed']} failed on the first attempt, "
+          f"{stats['retried']} recovered on retry)")
+    print(f"  Parsed: {stats['parsed']} ({stats['parse_failed']} failed)")
+    if failures.dead_lettered:
+        print(f"  {failures.dead_lettered} companies written to {dead_letter_file}")
+    return stats
+
+
+if __name__ == "__main__":
+    companies_csv = sys.argv[1] if len(sys.argv) > 1 else "all_bse_companies.csv"
+    fetch_concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    parse_workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    asyncio.run(run_pipeline(companies_csv, fetch_concurrency=fetch_concurrency, parse_workers=parse_workers))
@@ -0,0 +1,307 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import requests
+from bs4 import BeautifulSoup
+
+from main import (
+    analyze_shareholding_trends,
+    create_shareholding_dataframe,
+    release_soup,
+    save_shareholding_data_to_txt,
+)
+from main_executor import HEADERS, extract_sections, iter_companies
+from report_shards import company_path
+
+
+class StackSampler:
+    """
+    Sample the stack of one thread at a fixed interval
+
+    Samples are kept as collapsed stacks ("root;caller;callee count"), the
+    input format of flamegraph.pl and speedscope. Each stack is prefixed
+    with the current company and stage so the flamegraph splits by both.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self.labels = ('idle',)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frame_names(self, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = list(self.labels) + self._frame_names(frame)
+            self.samples[';'.join(stack)] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_collapsed(self, filename):
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class PipelineProfiler:
+    """
+    Record wall time, CPU samples and allocations per stage and per company
+
+    Use company() around each company and stage() around each step. With
+    trace_allocations, a tracemalloc snapshot is taken before and after every
+    stage and the top allocation sites of the difference are recorded; CPU
+    samples taken meanwhile are labelled 'profiler', not with the stage.
+
+    tracemalloc slows every allocation, which over-weights allocation-heavy
+    stages in CPU samples and wall times, so only one of sample_cpu and
+    trace_allocations may be set; run a separate pass for each.
+    """
+
+    def __init__(self, output_dir="profile_output", interval=0.005, sample_cpu=True, trace_allocations=False,
+                 top_allocations=10):
+        if sample_cpu and trace_allocations:
+            raise ValueError("Sample CPU and trace allocations in separate passes")
+        self.output_dir = output_dir
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+        self.sampler = StackSampler(interval) if sample_cpu else None
+        self.records = []
+        self.current_company = None
+        self._allocations_file = None
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._allocations_file = open(os.path.join(self.output_dir, 'stages.jsonl'), 'w', encoding='utf-8')
+        if self.trace_allocations:
+            tracemalloc.start(25)
+        if self.sampler:
+            self.sampler.start()
+
+    def stop(self):
+        outputs = ['stages.jsonl', 'summary.txt']
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler.write_collapsed(os.path.join(self.output_dir, 'cpu.collapsed'))
+            outputs.insert(0, 'cpu.collapsed')
+        if self.trace_allocations:
+            tracemalloc.stop()
+        self._allocations_file.close()
+
+        self.write_summary(os.path.join(self.output_dir, 'summary.txt'))
+        print(f"Profile written to {self.output_dir}/ ({', '.join(outputs)})")
+
+    def _label(self, *labels):
+        if self.sampler:
+            self.sampler.labels = labels
+
+    @contextmanager
+    def company(self, name):
+        self.current_company = name
+        self._label(name)
+        try:
+            yield
+        finally:
+            self.current_company = None
+            self._label('idle')
+
+    @contextmanager
+    def stage(self, name):
+        company = self.current_company or 'unknown'
+        # Snapshot and compare work is the profiler's own overhead; keep it
+        # in a separate bucket so it is not charged to the stage
+        self._label(company, 'profiler')
+
+        before = None
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            base_memory = tracemalloc.get_traced_memory()[0]
+
+        self._label(company, name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._label(company, 'profiler')
+            record = {'company': company, 'stage': name, 'wall_s': elapsed}
+
+            if self.trace_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                record['peak_kb'] = (peak - base_memory) / 1024
+                record['retained_kb'] = (current - base_memory) / 1024
+                record['top_allocations'] = [
+                    {'site': str(stat.traceback[0]), 'size_kb': stat.size_diff / 1024, 'count': stat.count_diff}
+                    for stat in after.compare_to(before, 'lineno')[:self.top_allocations]
+                ]
+                del before, after
+
+            self.records.append({key: record[key] for key in ('company', 'stage', 'wall_s', 'peak_kb') if key in record})
+            self._allocations_file.write(json.dumps(record) + "\n")
+            self._label(company)
+
+    def write_summary(self, filename):
+        totals = defaultdict(lambda: {'calls': 0, 'wall_s': 0.0, 'max_wall_s': 0.0, 'max_peak_kb': 0.0})
+        for record in self.records:
+            total = totals[record['stage']]
+            total['calls'] += 1
+            total['wall_s'] += record['wall_s']
+            total['max_wall_s'] = max(total['max_wall_s'], record['wall_s'])
+            total['max_peak_kb'] = max(total['max_peak_kb'], record.get('peak_kb', 0.0))
+
+        grand_total = sum(total['wall_s'] for total in totals.values()) or 1.0
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("PIPELINE PROFILE BY STAGE\n")
+            f.write("-" * 30 + "\n")
+            f.write(f"{'Stage':<24}{'Calls':>8}{'Total s':>12}{'Share':>8}{'Max s':>10}{'Max peak KB':>14}\n")
+            for stage, total in sorted(totals.items(), key=lambda item: -item[1]['wall_s']):
+                f.write(f"{stage:<24}{total['calls']:>8}{total['wall_s']:>12.3f}"
+                        f"{total['wall_s'] / grand_total * 100:>7.1f}%{total['max_wall_s']:>10.3f}"
+                        f"{total['max_peak_kb']:>14.1f}\n")
+
+
+def iter_workload(source, limit=None):
+    """
+    Yield (company name, page bytes or None, url) for profiling
+
+    source is either a directory of saved company pages (*.html, offline) or
+    a listing CSV whose companies are fetched during the fetch stage.
+    """
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.endswith('.html'))
+        for name in names[:limit]:
+            with open(os.path.join(source, name), 'rb') as f:
+                yield os.path.splitext(name)[0], f.read(), None
+        return
+
+    for i, company in enumerate(iter_companies(source)):
+        if limit is not None and i >= limit:
+            break
+        yield company['Name'], None, company['Url']
+
+
+def _profile_workload(profiler, workload, session, reports_dir, save_pages_dir=None):
+    """Run each company of the workload through the pipeline stages under profiler"""
+    profiler.start()
+    try:
+        for name, page_content, url in workload:
+            print(f"Profiling {name}")
+            safe_name = ''.join(c if c.isalnum() else '_' for c in name)
+            with profiler.company(name):
+                try:
+                    with profiler.stage('fetch'):
+                        if page_content is None:
+                            response = session.get(url, headers=HEADERS, timeout=30)
+                            response.raise_for_status()
+                            page_content = response.content
+                            response.close()
+
+                    if save_pages_dir and url:
+                        with open(os.path.join(save_pages_dir, f"{safe_name}.html"), 'wb') as f:
+                            f.write(page_content)
+
+                    with profiler.stage('parse'):
+                        soup = BeautifulSoup(page_content, 'html.parser')
+
+                    with profiler.stage('extract'):
+                        sections = extract_sections(soup)
+                    release_soup(soup)
+
+                    with profiler.stage('dataframe'):
+                        df = create_shareholding_dataframe(sections['shareholding'])
+
+                    with profiler.stage('trends'):
+                        trends = analyze_shareholding_trends(df)
+
+                    with profiler.stage('save'):
+                        source = f"Screener.in ({company_path({'Url': url})})" if url else f"Saved page ({name}.html)"
+                        save_shareholding_data_to_txt(sections['shareholding'],
+                                                      os.path.join(reports_dir, f"{safe_name}.txt"),
+                                                      trends=trends, company_name=name, source=source)
+                except requests.RequestException as e:
+                    print(f"  Error fetching {name}: {e}")
+                except Exception as e:
+                    print(f"  Error profiling {name}: {e}")
+    finally:
+        profiler.stop()
+
+    return profiler.records
+
+
+def profile_company_pipeline(source, limit=None, output_dir="profile_output", save_pages_dir=None,
+                             trace_allocations=True, interval=0.005):
+    """
+    Run the company pipeline under the profiler
+
+    Stages: fetch, parse (BeautifulSoup construction), extract (find_all
+    walks), dataframe (create_shareholding_dataframe), trends and save
+    (save_shareholding_data_to_txt). Fetched pages can be written to
+    save_pages_dir and profiled again offline by passing that directory as
+    source.
+
+    The first pass samples CPU into output_dir/cpu. With trace_allocations,
+    a second pass over the same pages traces allocations into
+    output_dir/allocations, so tracemalloc overhead never skews the
+    flamegraph or the stage wall times. Pages fetched in the first pass are
+    kept (in save_pages_dir, or output_dir/pages) for the second.
+
+    Returns:
+        Stage records of the CPU pass
+    """
+    if trace_allocations and not os.path.isdir(source) and not save_pages_dir:
+        save_pages_dir = os.path.join(output_dir, 'pages')
+    reports_dir = os.path.join(output_dir, 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    if save_pages_dir:
+        os.makedirs(save_pages_dir, exist_ok=True)
+
+    session = requests.Session()
+    try:
+        print("CPU pass")
+        cpu_profiler = PipelineProfiler(os.path.join(output_dir, 'cpu'), interval=interval)
+        records = _profile_workload(cpu_profiler, iter_workload(source, limit), session, reports_dir, save_pages_dir)
+    finally:
+        session.close()
+
+    if trace_allocations:
+        print("Allocation pass")
+        pages_source = source if os.path.isdir(source) else save_pages_dir
+        allocation_profiler = PipelineProfiler(os.path.join(output_dir, 'allocations'),
+                                               sample_cpu=False, trace_allocations=True)
+        _profile_workload(allocation_profiler, iter_workload(pages_source, limit), None, reports_dir)
+
+    return records
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "all_bse_companies.csv"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    profile_company_pipeline(source, limit)
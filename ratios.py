@@ -0,0 +1,113 @@
+import json
+import sys
+
+import pandas as pd
+
+
+# Currency symbols, Indian digit grouping commas, unit suffixes and percent signs
+NUMBER_NOISE_PATTERN = r'₹|Rs\.?|,|%|Cr\.?|\s'
+
+
+def normalize_indian_numbers(values):
+    """
+    Convert a Series of display strings such as "₹ 2,64,873 Cr." or "0.83 %"
+    to floats in one vectorized pass
+
+    Lakh/crore grouping ("40,08,506") is handled by dropping every comma, so
+    values keep the unit they are displayed in (Market Cap stays in crores).
+    Anything that does not parse becomes NaN.
+    """
+    cleaned = values.astype(str).str.replace(NUMBER_NOISE_PATTERN, '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+def _unstack(long_values):
+    """Unstack a (company, ratio) Series into columns of only the ratios it holds"""
+    # Filtering a stacked Series keeps every ratio in the index levels, and
+    # unstack would turn the filtered-out ones into all-NaN columns
+    long_values.index = long_values.index.remove_unused_levels()
+    return long_values.unstack()
+
+
+def normalize_top_ratios(raw_ratios):
+    """
+    Normalize raw top ratios for many companies into one typed table
+
+    Args:
+        raw_ratios: Mapping of company key -> {ratio name: raw display string}
+
+    Returns:
+        DataFrame indexed by every company key, in input order, with one
+        float column per ratio. "High / Low" pairs are split into "High"
+        and "Low" columns. Companies without ratios have an all-NaN row.
+    """
+    companies = list(raw_ratios)
+    # from_dict drops companies whose ratios are empty; they are put back below
+    raw = pd.DataFrame.from_dict(raw_ratios, orient='index')
+    if raw.empty:
+        return pd.DataFrame(index=companies, dtype='float64')
+
+    # Stack every ratio of every company into one long Series so each
+    # regex runs once over the whole universe instead of per cell
+    long_values = raw.stack()
+
+    pair_parts = long_values.astype(str).str.extract(r'^(?P<first>[^/]+?)\s*/\s*(?P<second>.+)$')
+    is_pair = pair_parts['first'].notna()
+
+    single = _unstack(normalize_indian_numbers(long_values[~is_pair]))
+
+    columns = [single]
+    if is_pair.any():
+        first = _unstack(normalize_indian_numbers(pair_parts.loc[is_pair, 'first']))
+        second = _unstack(normalize_indian_numbers(pair_parts.loc[is_pair, 'second']))
+        for name in first.columns:
+            # "High / Low" -> "High", "Low"
+            labels = [part.strip() for part in name.split('/')]
+            if len(labels) != 2:
+                labels = [f"{name} (1)", f"{name} (2)"]
+            columns.append(first[[name]].rename(columns={name: labels[0]}))
+            columns.append(second[[name]].rename(columns={name: labels[1]}))
+
+    table = pd.concat(columns, axis=1).reindex(companies)
+    return table.astype('float64')
+
+
+def build_top_ratios_table(universe_file="universe_data.jsonl", output_file="top_ratios.csv"):
+    """
+    Build the universe-wide top ratios table from the run_universe output
+
+    The table is written as CSV, or as Parquet when output_file ends in
+    .parquet (needs pyarrow).
+    """
+    raw_ratios = {}
+    names = {}
+
+    with open(universe_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = record['Url']
+            raw_ratios[key] = record.get('top_ratios') or {}
+            names[key] = record['Name']
+
+    if not raw_ratios:
+        print("No companies found in universe file")
+        return None
+
+    table = normalize_top_ratios(raw_ratios)
+    table.insert(0, 'Name', [names[key] for key in table.index])
+    table.index.name = 'Url'
+
+    if output_file.endswith('.parquet'):
+        table.to_parquet(output_file)
+    else:
+        table.to_csv(output_file)
+
+    print(f"Top ratios for {len(table)} companies saved to {output_file}")
+    return table
+
+
+if __name__ == "__main__":
+    universe_file = sys.argv[1] if len(sys.argv) > 1 else "universe_data.jsonl"
+    build_top_ratios_table(universe_file)
@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import sys
+import zipfile
+import zlib
+from datetime import datetime
+from multiprocessing import Pool
+
+from main import render_shareholding_report
+
+
+def trends_from_table(table):
+    """
+    Shareholding trends from an already-normalized quarterly-shp table
+
+    Produces the same structure as analyze_shareholding_trends without
+    building a DataFrame.
+    """
+    if not table or len(table['periods']) < 2:
+        return None
+
+    periods = table['periods']
+    trends = {'period': f"{periods[0]} to {periods[-1]}", 'changes': {}}
+
+    for label, values in zip(table['labels'], table['values']):
+        earliest, latest = values[0], values[-1]
+
+        if label == "No. of Shareholders":
+            if earliest and latest is not None:  # earliest of 0 has no percentage change
+                earliest, latest = int(earliest), int(latest)
+                trends['shareholder_change'] = {
+                    'absolute': latest - earliest,
+                    'percentage': (latest - earliest) / earliest * 100,
+                    'from': earliest,
+                    'to': latest,
+                }
+            else:
+                trends['shareholder_change'] = {'error': 'Could not calculate shareholder count change'}
+            continue
+
+        if earliest is None or latest is None:
+            trends['changes'][label] = {'error': 'Could not calculate change'}
+        else:
+            trends['changes'][label] = {'change': latest - earliest, 'from': earliest, 'to': latest}
+
+    return trends
+
+
+def company_path(record):
+    """Company part of a Screener URL, e.g. TATAMOTORS/consolidated"""
+    return re.sub(r'^https?://[^/]+/company/', '', record.get('Url') or '').strip('/')
+
+
+def report_member_name(record):
+    """Archive member name for a company, derived from its Screener URL"""
+    slug = re.sub(r'[^\w-]+', '_', company_path(record)) or re.sub(r'[^\w-]+', '_', record['Name'])
+    return f"{slug}.txt"
+
+
+def shard_for(member_name, shards):
+    """Stable shard number of an archive member"""
+    return zlib.crc32(member_name.encode('utf-8')) % shards
+
+
+def render_record(record, generated_on=None):
+    """Render one universe record; returns (member name, report bytes) or None"""
+    shareholding_data = record.get('shareholding')
+    if not shareholding_data:
+        return None
+
+    table = (record.get('financial_tables') or {}).get('quarterly-shp')
+    report = render_shareholding_report(
+        shareholding_data,
+        trends_from_table(table),
+        company_name=record['Name'],
+        source=f"Screener.in ({company_path(record)})",
+        generated_on=generated_on,
+    )
+    return report_member_name(record), report.encode('utf-8')
+
+
+def _render_record(args):
+    return render_record(*args)
+
+
+def _iter_records(universe_file):
+    with open(universe_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def render_reports_batch(universe_file="universe_data.jsonl", output_dir="report_shards", shards=8,
+                         workers=None, chunksize=64):
+    """
+    Render every company's shareholding report and pack them into archive shards
+
+    Reports are rendered in a process pool from the normalized panel data
+    in the universe file, so no page is fetched or parsed again. Each
+    report is one member of reports-NNN.zip, picked by a stable hash of
+    its name; index.json maps member names to shards. A company that
+    appears more than once is rendered from its last line.
+
+    Returns:
+        Number of reports written
+    """
+    # A company re-scraped by a replay appears again; as in the serving
+    # store, the later line wins
+    last_line = {}
+    for i, record in enumerate(_iter_records(universe_file)):
+        last_line[report_member_name(record)] = i
+
+    os.makedirs(output_dir, exist_ok=True)
+    generated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # Write to temporary names and swap in at the end so readers of the
+    # previous shards are not disturbed mid-run
+    shard_paths = [os.path.join(output_dir, f"reports-{i:03d}.zip") for i in range(shards)]
+    archives = [zipfile.ZipFile(f"{path}.tmp", 'w', compression=zipfile.ZIP_DEFLATED) for path in shard_paths]
+    index = {}
+
+    try:
+        with Pool(processes=workers) as pool:
+            tasks = ((record, generated_on) for i, record in enumerate(_iter_records(universe_file))
+                     if last_line[report_member_name(record)] == i)
+            for result in pool.imap_unordered(_render_record, tasks, chunksize=chunksize):
+                if result is None:
+                    continue
+                member_name, report = result
+                shard = shard_for(member_name, shards)
+                archives[shard].writestr(member_name, report)
+                index[member_name] = os.path.basename(shard_paths[shard])
+    finally:
+        for archive in archives:
+            archive.close()
+
+    for path in shard_paths:
+        os.replace(f"{path}.tmp", path)
+
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'generated_on': generated_on, 'reports': index}, f, ensure_ascii=False, indent=1)
+
+    print(f"Rendered {len(index)} reports into {shards} shards in {output_dir}")
+    return len(index)
+
+
+def read_report(member_name, output_dir="report_shards"):
+    """Read one rendered report back out of its shard"""
+    with open(os.path.join(output_dir, 'index.json'), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    with zipfile.ZipFile(os.path.join(output_dir, index['reports'][member_name])) as archive:
+        return archive.read(member_name).decode('utf-8')
+
+
+if __name__ == "__main__":
+    universe_file = sys.argv[1] if len(sys.argv) > 1 else "universe_data.jsonl"
+    render_reports_batch(universe_file)
@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+
+DEAD_LETTER_FILE = "dead_letters.jsonl"
+
+
+class Status(Enum):
+    OK = 'ok'
+    EMPTY = 'empty'
+    FAILED = 'failed'
+
+
+@dataclass
+class ItemOutcome:
+    """
+    Result of processing one work item (a listing page, a company, a document)
+
+    EMPTY means the item was processed and genuinely had no data; FAILED
+    means it could not be processed. retryable marks failures worth another
+    attempt, such as network errors, as opposed to parse errors that would
+    fail the same way again.
+    """
+    item: Any
+    status: Status
+    value: Any = None
+    error: Optional[str] = None
+    retryable: bool = False
+    attempts: int = 1
+
+    @property
+    def ok(self):
+        return self.status is not Status.FAILED
+
+
+def is_retryable_status(status_code):
+    """
+    Whether a failed request is worth another attempt
+
+    Network errors (no status code), 429 and 5xx responses are; other 4xx
+    responses will fail the same way again.
+    """
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def dead_letter_key(kind, item):
+    """Identity of a dead-lettered item; a kind and item are recorded only once"""
+    return kind, json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+@dataclass(order=True)
+class _Pending:
+    due: float
+    sequence: int
+    item: Any = field(compare=False)
+    attempts: int = field(compare=False)
+    error: Optional[str] = field(compare=False, default=None)
+
+
+class RetryQueue:
+    """
+    Retry failed items with exponential backoff, apart from the main pass
+
+    The main pass pushes failures here and keeps going; drain() then
+    re-runs them once they are due. Items still failing after max_attempts
+    (or failing with a non-retryable error) are appended to the dead-letter
+    file, which replay_dead_letters can feed back in later. An item already
+    in the dead-letter file, e.g. from an earlier run, is not added again.
+    """
+
+    def __init__(self, max_attempts=5, base_delay=2.0, max_delay=300.0, dead_letter_file=DEAD_LETTER_FILE, kind='item'):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_file = dead_letter_file
+        self.kind = kind
+        self.dead_lettered = 0
+        self._dead_letter_keys = None
+        self._heap = []
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempts):
+        """Delay before the next attempt: base_delay * 2^(attempts - 1), capped, with jitter"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def push(self, outcome):
+        """Schedule a failed outcome for retry, or dead-letter it"""
+        if not outcome.retryable or outcome.attempts >= self.max_attempts:
+            self.dead_letter(outcome)
+            return
+
+        self._sequence += 1
+        heapq.heappush(self._heap, _Pending(
+            due=time.monotonic() + self.backoff(outcome.attempts),
+            sequence=self._sequence,
+            item=outcome.item,
+            attempts=outcome.attempts,
+            error=outcome.error,
+        ))
+
+    def dead_letter(self, outcome):
+        self.dead_lettered += 1
+        print(f"  Dead-lettered {self.kind} after {outcome.attempts} attempts: {outcome.error}")
+
+        if self._dead_letter_keys is None:
+            self._dead_letter_keys = {
+                dead_letter_key(entry['kind'], entry['item']) for entry in load_dead_letters(self.dead_letter_file)
+            }
+        key = dead_letter_key(self.kind, outcome.item)
+        if key in self._dead_letter_keys:
+            return
+        self._dead_letter_keys.add(key)
+
+        with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'kind': self.kind,
+                'item': outcome.item,
+                'error': outcome.error,
+                'attempts': outcome.attempts,
+                'failed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }, ensure_ascii=False) + "\n")
+
+    def drain(self, process):
+        """
+        Retry queued items until the queue is empty
+
+        Args:
+            process: Callable taking an item and returning an ItemOutcome
+
+        Yields:
+            Successful (OK or EMPTY) outcomes
+        """
+        while self._heap:
+            pending = heapq.heappop(self._heap)
+            wait = pending.due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            print(f"Retrying {self.kind} (attempt {pending.attempts + 1}/{self.max_attempts})")
+            outcome = process(pending.item)
+            outcome.attempts = pending.attempts + 1
+
+            if outcome.ok:
+                yield outcome
+            else:
+                self.push(outcome)
+
+    async def drain_async(self, process):
+        """
+        drain() for asyncio callers: process is a coroutine function and the
+        backoff waits do not block the event loop
+        """
+        while self._heap:
+            pending = heapq.heappop(self._heap)
+            wait = pending.due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            print(f"Retrying {self.kind} (attempt {pending.attempts + 1}/{self.max_attempts})")
+            outcome = await process(pending.item)
+            outcome.attempts = pending.attempts + 1
+
+            if outcome.ok:
+                yield outcome
+            else:
+                self.push(outcome)
+
+
+def load_dead_letters(dead_letter_file=DEAD_LETTER_FILE, kind=None):
+    """
+    Read dead-lettered entries, optionally only those of one kind
+
+    Each kind and item is returned once; if the file holds it more than
+    once, the later line wins.
+    """
+    if not os.path.exists(dead_letter_file):
+        return []
+
+    entries = {}
+    with open(dead_letter_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Partially written last line from an interrupted run
+                continue
+            if kind is None or entry['kind'] == kind:
+                key = dead_letter_key(entry['kind'], entry['item'])
+                entries.pop(key, None)
+                entries[key] = entry
+    return list(entries.values())
+
+
+def remove_dead_letters(keys, dead_letter_file=DEAD_LETTER_FILE):
+    """Rewrite the dead-letter file without the entries of the given keys"""
+    if not keys:
+        return
+
+    entries = load_dead_letters(dead_letter_file)
+    tmp_path = f"{dead_letter_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            if dead_letter_key(entry['kind'], entry['item']) not in keys:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, dead_letter_file)
+
+
+def replay_dead_letters(process, kind, dead_letter_file=DEAD_LETTER_FILE, max_attempts=5):
+    """
+    Run dead-lettered items of one kind through process again
+
+    An entry is removed from the dead-letter file only after its item has
+    succeeded and the caller has taken the outcome, so interrupting a
+    replay loses nothing. Items that fail again stay in the file.
+
+    Yields:
+        Successful outcomes
+    """
+    replay = load_dead_letters(dead_letter_file, kind)
+    print(f"Replaying {len(replay)} dead-lettered {kind} items")
+
+    queue = RetryQueue(max_attempts=max_attempts, dead_letter_file=dead_letter_file, kind=kind)
+    resolved = set()
+
+    try:
+        for entry in replay:
+            outcome = process(entry['item'])
+            if outcome.ok:
+                yield outcome
+                resolved.add(dead_letter_key(kind, outcome.item))
+            else:
+                queue.push(outcome)
+
+        for outcome in queue.drain(process):
+            yield outcome
+            resolved.add(dead_letter_key(kind, outcome.item))
+    finally:
+        remove_dead_letters(resolved, dead_letter_file)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+
+# Returned by SectionCache.get on a miss, since None is a valid cached result
+MISS = object()
+
+
+def content_hash(page_content):
+    """Hash of a page's raw bytes, used as the cache key"""
+    if isinstance(page_content, str):
+        page_content = page_content.encode('utf-8')
+    return hashlib.sha256(page_content).hexdigest()
+
+
+class SectionCache:
+    """
+    Persistent cache of extracted section results
+
+    Entries live at <cache_dir>/<section>/v<version>/<hash[:2]>/<hash>.json,
+    so bumping one extractor's version misses only that section's entries.
+    Hits refresh the entry's mtime; once the cache grows past max_bytes the
+    least recently used entries are deleted until it is back under
+    low_water * max_bytes.
+    """
+
+    def __init__(self, cache_dir="section_cache", max_bytes=2 * 1024 ** 3, low_water=0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, section, version, page_hash):
+        return os.path.join(self.cache_dir, section, f"v{version}", page_hash[:2], f"{page_hash}.json")
+
+    def get(self, section, version, page_hash):
+        path = self._path(section, version, page_hash)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return MISS
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, section, version, page_hash, value):
+        path = self._path(section, version, page_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            over_limit = self._size > self.max_bytes
+
+        if over_limit:
+            self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under the low-water mark"""
+        with self._lock:
+            entries = sorted(self._entries())
+            size = sum(entry_size for _, entry_size, _ in entries)
+            target = self.max_bytes * self.low_water
+            removed = 0
+
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                removed += 1
+
+            self._size = size
+
+        print(f"Section cache: evicted {removed} entries, {size / 1024 ** 2:.1f} MB remaining")
+        return removed
+
+    def purge_stale_versions(self, versions):
+        """Delete all entries of extractor versions other than the current ones"""
+        for section in os.listdir(self.cache_dir):
+            section_dir = os.path.join(self.cache_dir, section)
+            if not os.path.isdir(section_dir):
+                continue
+            for version_dir in os.listdir(section_dir):
+                if section not in versions or version_dir != f"v{versions[section]}":
+                    shutil.rmtree(os.path.join(section_dir, version_dir), ignore_errors=True)
+
+        with self._lock:
+            self._size = None
@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from ratios import normalize_top_ratios
+
+
+STORE_DIR = "serving_store"
+
+# Panel name -> financial table it is packed from
+TABLE_PANELS = {
+    'shareholding': 'quarterly-shp',
+    'ratios': 'ratios',
+}
+
+
+def _period_key(label):
+    """Sort key for period labels such as "Mar 2025"; unknown labels sort last"""
+    try:
+        parsed = datetime.strptime(label, '%b %Y')
+        return (0, parsed.year, parsed.month, label)
+    except ValueError:
+        return (1, 0, 0, label)
+
+
+def _iter_records(universe_file):
+    with open(universe_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _collect_axes(universe_file):
+    """First pass: company keys and the union of periods and labels of each panel"""
+    companies = []
+    names = []
+    periods = {panel: set() for panel in TABLE_PANELS}
+    labels = {panel: {} for panel in TABLE_PANELS}
+    raw_ratios = {}
+
+    for record in _iter_records(universe_file):
+        # A company re-scraped by a replay appears again; the later line wins
+        if record['Url'] not in raw_ratios:
+            companies.append(record['Url'])
+            names.append(record['Name'])
+        raw_ratios[record['Url']] = record.get('top_ratios') or {}
+
+        tables = record.get('financial_tables') or {}
+        for panel, table_id in TABLE_PANELS.items():
+            table = tables.get(table_id)
+            if not table:
+                continue
+            periods[panel].update(table['periods'])
+            for label in table['labels']:
+                # dict keeps first-seen label order
+                labels[panel].setdefault(label, None)
+
+    return companies, names, periods, labels, raw_ratios
+
+
+def build_serving_store(universe_file="universe_data.jsonl", store_dir=STORE_DIR, keep_releases=3):
+    """
+    Pack the universe output into memory-mappable arrays and publish them
+
+    Each panel becomes a float64 .npy array of shape
+    (company, period, category), NaN where a company has no value. The
+    top ratios become a (company, ratio) array. index.json holds the axis
+    labels. A new release directory is written in full and then published
+    by atomically repointing the 'current' symlink, so readers never see a
+    half-written store.
+
+    Returns:
+        Path of the new release
+    """
+    companies, names, periods, labels, raw_ratios = _collect_axes(universe_file)
+    if not companies:
+        print("No companies found in universe file")
+        return None
+
+    company_positions = {key: i for i, key in enumerate(companies)}
+    axes = {
+        panel: {
+            'periods': sorted(periods[panel], key=_period_key),
+            'categories': list(labels[panel]),
+        }
+        for panel in TABLE_PANELS
+    }
+
+    arrays = {
+        panel: np.full((len(companies), len(axes[panel]['periods']), len(axes[panel]['categories'])),
+                       np.nan, dtype='float64')
+        for panel in TABLE_PANELS
+    }
+    period_positions = {panel: {p: i for i, p in enumerate(axes[panel]['periods'])} for panel in TABLE_PANELS}
+    category_positions = {panel: {c: i for i, c in enumerate(axes[panel]['categories'])} for panel in TABLE_PANELS}
+
+    # Second pass: scatter each company's table into its slice
+    for record in _iter_records(universe_file):
+        row = company_positions[record['Url']]
+        tables = record.get('financial_tables') or {}
+        for panel, table_id in TABLE_PANELS.items():
+            # A later line for the same company replaces it wholesale, even
+            # where it has no table for this panel
+            arrays[panel][row] = np.nan
+            table = tables.get(table_id)
+            if not table or not table['labels']:
+                continue
+            values = np.array(table['values'], dtype='float64').reshape(len(table['labels']), len(table['periods']))
+            period_index = [period_positions[panel][p] for p in table['periods']]
+            category_index = [category_positions[panel][c] for c in table['labels']]
+            arrays[panel][row][np.ix_(period_index, category_index)] = values.T
+
+    top_ratios = normalize_top_ratios(raw_ratios).reindex(companies)
+    arrays['top_ratios'] = top_ratios.to_numpy(dtype='float64')
+    axes['top_ratios'] = {'ratios': list(top_ratios.columns)}
+
+    releases_dir = os.path.join(store_dir, 'releases')
+    release_name = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    release_dir = os.path.join(releases_dir, release_name)
+    os.makedirs(release_dir)
+
+    for panel, array in arrays.items():
+        np.save(os.path.join(release_dir, f"{panel}.npy"), array)
+
+    with open(os.path.join(release_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'companies': companies, 'names': names, 'axes': axes}, f, ensure_ascii=False)
+
+    # Atomic publish: build the new link beside the old one, then rename over it
+    current_link = os.path.join(store_dir, 'current')
+    tmp_link = os.path.join(store_dir, f"current.{os.getpid()}.tmp")
+    os.symlink(os.path.join('releases', release_name), tmp_link)
+    os.replace(tmp_link, current_link)
+
+    for old_release in sorted(os.listdir(releases_dir))[:-keep_releases]:
+        shutil.rmtree(os.path.join(releases_dir, old_release), ignore_errors=True)
+
+    print(f"Serving store release {release_name}: {len(companies)} companies")
+    for panel, array in arrays.items():
+        print(f"  {panel}: {array.shape}")
+    return release_dir
+
+
+class ServingStore:
+    """
+    Read-only view of the current serving store release
+
+    Arrays are memory-mapped, so opening costs no parsing and every process
+    reading the same release shares its pages through the OS page cache.
+    Call refresh() to pick up a newly published release.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.release = None
+        self.refresh()
+
+    def refresh(self):
+        """Reopen the store if a new release has been published; returns True if it changed"""
+        release = os.path.realpath(os.path.join(self.store_dir, 'current'))
+        if release == self.release:
+            return False
+
+        with open(os.path.join(release, 'index.json'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        self.axes = index['axes']
+        self.category_positions = {
+            panel: {category: i for i, category in enumerate(self.axes[panel]['categories'])}
+            for panel in TABLE_PANELS
+        }
+        self.ratio_positions = {ratio: i for i, ratio in enumerate(self.axes['top_ratios']['ratios'])}
+        self.companies = {key: i for i, key in enumerate(index['companies'])}
+        self.names = {name.lower(): i for i, name in enumerate(index['names'])}
+        self.arrays = {
+            panel: np.load(os.path.join(release, f"{panel}.npy"), mmap_mode='r')
+            for panel in list(TABLE_PANELS) + ['top_ratios']
+        }
+        self.release = release
+        return True
+
+    def company_index(self, company):
+        """Row of a company, looked up by Url or (case-insensitive) name"""
+        if company in self.companies:
+            return self.companies[company]
+        return self.names[company.lower()]
+
+    def series(self, company, category, panel='shareholding', last=8):
+        """
+        Values of one category for the last `last` periods
+
+        Returns:
+            List of (period, value) pairs for periods that have a value
+        """
+        axes = self.axes[panel]
+        row = self.company_index(company)
+        column = self.category_positions[panel][category]
+
+        values = self.arrays[panel][row, :, column]
+        present = np.flatnonzero(~np.isnan(values))[-last:]
+        return [(axes['periods'][i], float(values[i])) for i in present]
+
+    def top_ratio(self, company, ratio):
+        value = self.arrays['top_ratios'][self.company_index(company), self.ratio_positions[ratio]]
+        return None if np.isnan(value) else float(value)
+
+
+if __name__ == "__main__":
+    universe_file = sys.argv[1] if len(sys.argv) > 1 else "universe_data.jsonl"
+    build_serving_store(universe_file)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Endpoint behind the '+' buttons, called by Company.showShareholders on the page
+BREAKDOWN_URL = "https://www.screener.in/api/3/{company_id}/investors/{classification}/{period}/"
+
+SHOW_SHAREHOLDERS_PATTERN = re.compile(r"showShareholders\(\s*'([^']+)'\s*,\s*'([^']+)'")
+
+_thread_local = threading.local()
+
+
+def extract_shareholding_drilldowns(soup):
+    """
+    Extract the expandable shareholding categories from a company page
+
+    Returns:
+        Dictionary with the page's company id and a list of drill-downs,
+        each {'category', 'classification', 'period', 'as_of'}. as_of is the
+        latest period column of the drill-down's table, e.g. "Jun 2025";
+        the breakdown behind the same URL changes when it does.
+    """
+    company_info = soup.find(id='company-info')
+    company_id = None
+    if company_info:
+        company_id = company_info.get('data-warehouse-id') or company_info.get('data-company-id')
+
+    drilldowns = []
+    for container_id in ('quarterly-shp', 'yearly-shp'):
+        container = soup.find('div', id=container_id)
+        if not container:
+            continue
+
+        thead = container.find('thead')
+        periods = [th.get_text(strip=True) for th in thead.find_all('th')] if thead else []
+        as_of = next((period for period in reversed(periods) if period), None)
+
+        for button in container.find_all('button', onclick=SHOW_SHAREHOLDERS_PATTERN):
+            match = SHOW_SHAREHOLDERS_PATTERN.search(button['onclick'])
+            drilldowns.append({
+                'category': button.get_text(strip=True).replace('+', '').strip(),
+                'classification': match.group(1),
+                'period': match.group(2),
+                'as_of': as_of,
+            })
+
+    return {'company_id': company_id, 'drilldowns': drilldowns}
+
+
+def _session():
+    """One requests session per worker thread"""
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+        _thread_local.session.headers.update(HEADERS)
+    return _thread_local.session
+
+
+def _cache_path(cache_dir, url, as_of):
+    key = f"{url} {as_of}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def fetch_breakdown(url, cache_dir="breakdown_cache", as_of=None):
+    """
+    Fetch one drill-down breakdown, reading and filling the on-disk cache
+
+    The cache is keyed on the URL and as_of, the latest period shown on the
+    company page, since the URL stays the same when a new quarter is added.
+    Without as_of the breakdown is always fetched and not cached.
+    """
+    path = _cache_path(cache_dir, url, as_of) if as_of else None
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    response = _session().get(url, timeout=30)
+    response.raise_for_status()
+    holders = response.json()
+    if not path:
+        return holders
+
+    # Write then rename so an interrupted run never leaves a truncated entry
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(holders, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    return holders
+
+
+def fetch_breakdowns(urls, max_workers=4, cache_dir="breakdown_cache", as_of=None):
+    """
+    Fetch many drill-down breakdowns concurrently
+
+    Args:
+        urls: Breakdown API URLs
+        max_workers: Number of concurrent requests
+        cache_dir: Directory of cached responses
+        as_of: Dictionary of url -> latest period (see fetch_breakdown)
+
+    Returns:
+        Dictionary of url -> holders (None for failed requests)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_breakdown, url, cache_dir, (as_of or {}).get(url)): url
+            for url in set(urls)
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except requests.RequestException as e:
+                print(f"  Error fetching breakdown {url}: {e}")
+                results[url] = None
+            except ValueError as e:
+                print(f"  Invalid breakdown response {url}: {e}")
+                results[url] = None
+
+    return results
+
+
+def _iter_batches(universe_file, batch_size):
+    """Yield lists of universe records that have drill-downs, batch_size at a time"""
+    batch = []
+    with open(universe_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            drilldowns = record.get('shareholding_drilldowns') or {}
+            if not drilldowns.get('company_id') or not drilldowns.get('drilldowns'):
+                continue
+            batch.append({'Url': record['Url'], 'Name': record['Name'], **drilldowns})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def fetch_universe_breakdowns(universe_file="universe_data.jsonl", output_file="shareholding_breakdowns.jsonl",
+                              batch_size=50, max_workers=4, cache_dir="breakdown_cache"):
+    """
+    Fetch the drill-down breakdown of every expandable category for every
+    company in the run_universe output
+
+    Requests for batch_size companies are issued together so the worker pool
+    stays busy across company boundaries. Output has one JSON line per
+    company, keyed by the same Url as the universe file:
+    {'Url', 'Name', 'breakdowns': {period: {category: holders}}}
+    """
+    companies = 0
+    failed = 0
+
+    with open(output_file, 'w', encoding='utf-8') as out:
+        for batch in _iter_batches(universe_file, batch_size):
+            as_of = {
+                BREAKDOWN_URL.format(company_id=company['company_id'], **drilldown): drilldown.get('as_of')
+                for company in batch
+                for drilldown in company['drilldowns']
+            }
+            print(f"Fetching {len(as_of)} breakdowns for {len(batch)} companies...")
+            results = fetch_breakdowns(list(as_of), max_workers=max_workers, cache_dir=cache_dir, as_of=as_of)
+
+            for company in batch:
+                breakdowns = {}
+                for drilldown in company['drilldowns']:
+                    url = BREAKDOWN_URL.format(company_id=company['company_id'], **drilldown)
+                    holders = results.get(url)
+                    if holders is None:
+                        failed += 1
+                        continue
+                    breakdowns.setdefault(drilldown['period'], {})[drilldown['category']] = holders
+
+                out.write(json.dumps({'Url': company['Url'], 'Name': company['Name'], 'breakdowns': breakdowns},
+                                     ensure_ascii=False) + "\n")
+                companies += 1
+            out.flush()
+
+    print(f"Breakdowns saved for {companies} companies to {output_file} ({failed} failed requests)")
+    return companies
+
+
+if __name__ == "__main__":
+    universe_file = sys.argv[1] if len(sys.argv) > 1 else "universe_data.jsonl"
+    fetch_universe_breakdowns(universe_file)
@@ -0,0 +1,45 @@
+"""Synthetic Screener pages shared by the tests"""
+
+
+def company_page(n):
+    """Synthetic company page with every section the extractors look for"""
+    quarters = [f"{month} {2020 + year}" for year in range(2) for month in ('Mar', 'Jun', 'Sep', 'Dec')]
+    header = ''.join(f"<th>{quarter}</th>" for quarter in quarters)
+    shp_rows = ''.join(
+        f"<tr><td><button onclick=\"Company.showShareholders('{category.lower()}', 'quarterly')\">"
+        f"{category}&nbsp;+</button></td>"
+        + ''.join(f"<td>{(n + i) % 100}.{i:02d}%</td>" for i in range(len(quarters))) + "</tr>"
+        for category in ('Promoters', 'FIIs', 'DIIs', 'Public')
+    )
+    ratio_rows = ''.join(
+        f"<tr><td>{label}</td>" + ''.join(f"<td>{n * 7 + i:,}</td>" for i in range(len(quarters))) + "</tr>"
+        for label in ('Debtor Days', 'Inventory Days', 'ROCE %')
+    )
+    documents = ''.join(
+        f"<li><a href='https://example.com/{kind}/{n}/{i}.pdf'>Document {i}"
+        f"<div class='ink-600 smaller'>from bse</div></a></li>"
+        for kind in ('annual', 'rating') for i in range(2)
+    )
+
+    concalls = ''.join(
+        f"<li>{month} 2024<a href='https://example.com/concall/{n}/{month}.pdf'>Transcript</a>"
+        f"<a href='https://example.com/concall/{n}/{month}-ppt.pdf'>PPT</a></li>"
+        for month in ('Feb', 'Aug')
+    )
+
+    return f"""<html><body>
+    <div id="company-info" data-warehouse-id="{n}"></div>
+    <ul id="top-ratios">
+      <li><span class="name">Market Cap</span><span class="value">&#8377; {n * 13:,} Cr.</span></li>
+      <li><span class="name">High / Low</span><span class="value">&#8377; {n + 50} / {n}</span></li>
+    </ul>
+    <div id="quarterly-shp"><table class="data-table">
+      <thead><tr><th></th>{header}</tr></thead><tbody>{shp_rows}</tbody>
+    </table></div>
+    <div id="ratios"><table class="data-table">
+      <thead><tr><th></th>{header}</tr></thead><tbody>{ratio_rows}</tbody>
+    </table></div>
+    <div class="documents annual-reports flex-column"><ul class="list-links">{documents}</ul></div>
+    <div class="documents credit-ratings flex-column"><ul class="list-links">{documents}</ul></div>
+    <div class="documents concalls flex-column"><ul class="list-links">{concalls}</ul></div>
+    </body></html>""".encode('utf-8')
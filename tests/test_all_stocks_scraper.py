@@ -0,0 +1,32 @@
+import csv
+
+import all_stocks_scraper
+from all_stocks_scraper import replay_failed_pages
+from retry_queue import ItemOutcome, RetryQueue, Status, load_dead_letters
+
+
+def test_replay_failed_pages_appends_new_stocks(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'all_bse_companies.csv')
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['S.No', 'Name', 'Url'])
+        writer.writeheader()
+        writer.writerow({'S.No': 1, 'Name': 'A', 'Url': 'https://www.screener.in/company/A/'})
+        writer.writerow({'S.No': 2, 'Name': 'B', 'Url': 'https://www.screener.in/company/B/'})
+
+    dead_letter_file = str(tmp_path / 'dead_letters.jsonl')
+    RetryQueue(dead_letter_file=dead_letter_file, kind='listing_page').dead_letter(
+        ItemOutcome(2, Status.FAILED, error="503 Server Error", retryable=True))
+
+    def fetch(page, base_url, headers):
+        rows = [{'Company Id': name, 'Name': name, 'Url': f"https://www.screener.in/company/{name}/"}
+                for name in ('B', 'C', 'D')]
+        return ItemOutcome(page, Status.OK, value=rows)
+
+    monkeypatch.setattr(all_stocks_scraper, 'fetch_listing_page_outcome', fetch)
+
+    assert replay_failed_pages(filename, dead_letter_file=dead_letter_file) == 2
+
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        saved = [(row['S.No'], row['Name']) for row in csv.DictReader(f)]
+    assert saved == [('1', 'A'), ('2', 'B'), ('3', 'C'), ('4', 'D')]
+    assert load_dead_letters(dead_letter_file) == []
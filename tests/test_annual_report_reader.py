@@ -0,0 +1,118 @@
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from annual_report_reader import build_section_index, load_section_index, read_section
+
+
+FONT = DictionaryObject({
+    NameObject('/Type'): NameObject('/Font'),
+    NameObject('/Subtype'): NameObject('/Type1'),
+    NameObject('/BaseFont'): NameObject('/Helvetica'),
+})
+
+
+def text_page(writer, lines):
+    page = writer.add_blank_page(width=612, height=792)
+    commands = ['BT', '/F1 12 Tf', '14 TL', '72 720 Td']
+    for line in lines:
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        commands.append(f'({escaped}) Tj T*')
+    commands.append('ET')
+    content = DecodedStreamObject()
+    content.set_data('\n'.join(commands).encode('latin-1'))
+    page.replace_contents(content)
+    page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/Font'): DictionaryObject({NameObject('/F1'): FONT}),
+    })
+
+
+# Body pages 1..8: cover, chairman's letter, MD&A over two pages, directors'
+# report, financial statements over two pages, notes
+BODY = [
+    ['Annual Report 2024'],
+    ["Chairman's Letter", 'Dear shareholders'],
+    ['Management Discussion and Analysis', 'Industry structure and outlook'],
+    ['Opportunities and threats', 'Segment performance'],
+    ["Directors' Report", 'Your directors present the report'],
+    ['Consolidated Financial Statements', 'Balance sheet'],
+    ['Statement of profit and loss'],
+    ['Notes to accounts'],
+]
+
+
+def write_pdf(path, with_outline):
+    writer = PdfWriter()
+    if with_outline:
+        for lines in BODY:
+            text_page(writer, lines)
+        writer.add_outline_item("Chairman's Letter", 1)
+        writer.add_outline_item('Management Discussion and Analysis', 2)
+        directors = writer.add_outline_item("Directors' Report", 4)
+        writer.add_outline_item('Board composition', 4, parent=directors)
+        writer.add_outline_item('Consolidated Financial Statements', 5)
+        writer.add_outline_item('Notes to accounts', 7)
+    else:
+        # Printed contents page ahead of the body; printed page numbers
+        # count the cover as page 1, so each section sits one PDF page later
+        text_page(writer, [
+            'Contents',
+            "Chairman's Letter ........ 2",
+            'Management Discussion and Analysis ........ 3',
+            "Directors' Report ........ 5",
+            'Consolidated Financial Statements ........ 6',
+            'Notes to accounts ........ 8',
+        ])
+        for lines in BODY:
+            text_page(writer, lines)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def test_section_index_from_outline(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    write_pdf(path, with_outline=True)
+
+    index = build_section_index(path)
+    assert index['source'] == 'outline'
+    assert index['page_count'] == 8
+    assert index['sections'] == {
+        'mdna': [2, 3],
+        'directors_report': [4, 4],
+        'financial_statements': [5, 6],
+    }
+
+
+def test_section_index_from_printed_toc(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    write_pdf(path, with_outline=False)
+
+    index = build_section_index(path)
+    assert index['source'] == 'printed_toc'
+    assert index['sections'] == {
+        'mdna': [3, 4],
+        'directors_report': [5, 5],
+        'financial_statements': [6, 7],
+    }
+
+
+def test_read_section_reads_only_its_pages(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    write_pdf(path, with_outline=True)
+
+    text = read_section(path, 'mdna')
+    assert 'Industry structure' in text
+    assert 'Segment performance' in text
+    assert 'Chairman' not in text
+    assert 'Directors' not in text
+
+    assert 'Segment performance' not in read_section(path, 'mdna', max_pages=1)
+    assert read_section(path, 'corporate_governance') is None
+
+
+def test_section_index_is_cached_until_the_file_changes(tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    write_pdf(path, with_outline=True)
+    assert load_section_index(path)['source'] == 'outline'
+
+    write_pdf(path, with_outline=False)
+    assert load_section_index(path)['source'] == 'printed_toc'
@@ -0,0 +1,103 @@
+import requests
+
+import company_master
+from company_master import changed_pages, crawl_listing_snapshot
+
+
+class ChangingListing:
+    """
+    Fake screen of 3 rows per page whose ordering changes once, right after
+    the change_after-th page request, and whose failing pages raise
+    """
+
+    page_size = 3
+
+    def __init__(self, ids, change_after=0, change=None, failing=None):
+        self.ids = list(ids)
+        self.change_after = change_after
+        self.change = change
+        self.failing = dict(failing or {})
+        self.requests = 0
+
+    def fetch(self, session, page, base_url):
+        self.requests += 1
+        if self.failing.get(page):
+            self.failing[page] -= 1
+            raise requests.ConnectionError(f"page {page} timed out")
+
+        start = (page - 1) * self.page_size
+        rows = self.ids[start:start + self.page_size]
+
+        if self.requests == self.change_after:
+            self.change(self.ids)
+
+        if not rows:
+            return None
+        return [{'Company Id': company_id, 'Name': company_id.upper(), 'Url': f"/company/{company_id}/"}
+                for company_id in rows]
+
+
+def crawl(monkeypatch, listing):
+    monkeypatch.setattr(company_master, 'fetch_listing_page', listing.fetch)
+    companies = crawl_listing_snapshot(max_pages=20, delay=0)
+    if companies is None:
+        return None
+    return [company['Company Id'] for company in companies]
+
+
+def test_removal_ahead_of_crawl_position_does_not_lose_companies(monkeypatch):
+    # 'a' is delisted once pages 1 and 2 have been read, so a single pass
+    # sees [a,b,c] [d,e,f] [h,i,j] [k,l] and never sees 'g'
+    listing = ChangingListing('abcdefghijkl', change_after=2, change=lambda ids: ids.remove('a'))
+
+    assert crawl(monkeypatch, listing) == list('bcdefghijkl')
+
+
+def test_insertion_ahead_of_crawl_position_is_not_duplicated(monkeypatch):
+    listing = ChangingListing('abcdefghijkl', change_after=2, change=lambda ids: ids.insert(0, 'x'))
+
+    assert crawl(monkeypatch, listing) == list('xabcdefghijkl')
+
+
+def test_removal_during_verification_walks_back_to_the_change(monkeypatch):
+    # Pages 1 and 2 are re-read unchanged, then 'a' goes; the drift only
+    # shows from page 3 but pages 1 and 2 are stale too
+    listing = ChangingListing('abcdefghijkl', change_after=7, change=lambda ids: ids.remove('a'))
+
+    assert crawl(monkeypatch, listing) == list('bcdefghijkl')
+
+
+def test_stable_listing_is_read_twice(monkeypatch):
+    listing = ChangingListing('abcdefghijklmnopqrstuvwxyz')
+
+    assert crawl(monkeypatch, listing) == list('abcdefghijklmnopqrstuvwxyz')
+    # Nine pages read twice, plus the empty page that ends the listing twice
+    assert listing.requests == 20
+
+
+def test_late_drift_refetches_only_the_tail(monkeypatch):
+    # 'w' (page 8) is delisted during the verification read of page 8
+    listing = ChangingListing('abcdefghijklmnopqrstuvwxyz', change_after=17, change=lambda ids: ids.remove('w'))
+
+    assert crawl(monkeypatch, listing) == list('abcdefghijklmnopqrstuvxyz')
+    assert listing.requests < 20 + 9
+
+
+def test_transient_page_failure_is_retried(monkeypatch):
+    listing = ChangingListing('abcdefghijkl', failing={2: 1})
+
+    assert crawl(monkeypatch, listing) == list('abcdefghijkl')
+
+
+def test_failing_page_is_never_saved_as_removed_companies(monkeypatch):
+    listing = ChangingListing('abcdefghijkl', failing={2: 100})
+
+    assert crawl(monkeypatch, listing) is None
+
+
+def test_changed_pages():
+    previous = {1: ['a', 'b', 'c'], 2: ['d', 'e', 'f'], 3: ['h', 'i', 'j'], 4: ['k', 'l']}
+    current = {1: ['b', 'c', 'd'], 2: ['e', 'f', 'g'], 3: ['h', 'i', 'j'], 4: ['k', 'l']}
+
+    assert changed_pages(previous, current) == [1, 2]
+    assert changed_pages(previous, {**previous, 5: ['m']}) == [5]
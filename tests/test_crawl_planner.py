@@ -0,0 +1,36 @@
+import requests
+
+import crawl_planner
+from url_resolver import load_resolver_cache
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+FAILURES = {
+    'https://example.com/forbidden.pdf': http_error(403),
+    'https://example.com/unavailable.pdf': http_error(503),
+    'https://example.com/throttled.pdf': http_error(429),
+    'https://example.com/offline.pdf': requests.ConnectionError("connection reset"),
+}
+
+
+def test_probe_sizes_caches_only_non_retryable_failures(tmp_path, monkeypatch):
+    probed = []
+
+    def probe_size(url):
+        probed.append(url)
+        raise FAILURES[url]
+
+    monkeypatch.setattr(crawl_planner, 'probe_size', probe_size)
+    cache_file = str(tmp_path / 'probe_cache.jsonl')
+
+    crawl_planner.probe_sizes(list(FAILURES), max_workers=2, cache_file=cache_file)
+    assert list(load_resolver_cache(cache_file)) == ['https://example.com/forbidden.pdf']
+
+    probed.clear()
+    crawl_planner.probe_sizes(list(FAILURES), max_workers=2, cache_file=cache_file)
+    assert sorted(probed) == sorted(url for url in FAILURES if url != 'https://example.com/forbidden.pdf')
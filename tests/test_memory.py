@@ -0,0 +1,76 @@
+import csv
+import tracemalloc
+
+import main_executor
+from main_executor import run_universe
+from pages import company_page
+
+
+COMPANIES = 60
+BASELINE_COMPANY = 10
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PeakSamplingSession:
+    """
+    Serves synthetic company pages and records the tracemalloc peak of the
+    work done between two page requests, i.e. of one company
+    """
+
+    def __init__(self):
+        self.peaks = []
+
+    def get(self, url, headers=None, timeout=None):
+        _, peak = tracemalloc.get_traced_memory()
+        self.peaks.append(peak)
+        tracemalloc.reset_peak()
+        return FakeResponse(company_page(int(url.rstrip('/').rsplit('/', 1)[-1])))
+
+    def close(self):
+        pass
+
+
+def run_with_peaks(tmp_path, monkeypatch, **kwargs):
+    companies_csv = tmp_path / 'companies.csv'
+    with open(companies_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['S.No', 'Name', 'Url'])
+        writer.writeheader()
+        for n in range(1, COMPANIES + 1):
+            writer.writerow({'S.No': n, 'Name': f"Company {n}", 'Url': f"https://www.screener.in/company/{n}"})
+
+    session = PeakSamplingSession()
+    monkeypatch.setattr(main_executor.requests, 'Session', lambda: session)
+
+    tracemalloc.start()
+    try:
+        stats = run_universe(str(companies_csv), str(tmp_path / 'universe_data.jsonl'), delay=0,
+                             baseline_company=BASELINE_COMPANY, dead_letter_file=str(tmp_path / 'dead.jsonl'),
+                             **kwargs)
+        session.get('https://www.screener.in/company/0')
+    finally:
+        tracemalloc.stop()
+
+    assert stats['processed'] == COMPANIES
+    # peaks[i] covers company i; the first company also pays for one-off
+    # setup (imports, caches) and is left out of the baseline
+    baseline = max(session.peaks[2:BASELINE_COMPANY + 1])
+    return max(session.peaks[BASELINE_COMPANY + 1:]) - baseline
+
+
+def test_run_universe_peak_memory_stays_flat(tmp_path, monkeypatch):
+    assert run_with_peaks(tmp_path, monkeypatch) < 64 * 1024
+
+
+def test_collecting_results_is_caught(tmp_path, monkeypatch):
+    # The same measurement must see results kept across companies
+    assert run_with_peaks(tmp_path, monkeypatch, bounded_memory=False) > 64 * 1024
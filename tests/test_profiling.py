@@ -0,0 +1,43 @@
+import json
+import tracemalloc
+
+import pytest
+
+import profiling
+from pages import company_page
+
+
+def test_cpu_and_allocation_passes_are_separate(tmp_path, monkeypatch):
+    pages_dir = tmp_path / 'pages'
+    pages_dir.mkdir()
+    (pages_dir / 'ACME.html').write_bytes(company_page(1))
+
+    tracing_during_samples = []
+    original_run = profiling.StackSampler._run
+
+    def run(self):
+        tracing_during_samples.append(tracemalloc.is_tracing())
+        original_run(self)
+
+    monkeypatch.setattr(profiling.StackSampler, '_run', run)
+    output_dir = tmp_path / 'profile'
+    profiling.profile_company_pipeline(str(pages_dir), output_dir=str(output_dir))
+
+    assert tracing_during_samples == [False]
+    assert (output_dir / 'cpu' / 'cpu.collapsed').exists()
+    assert not (output_dir / 'allocations' / 'cpu.collapsed').exists()
+
+    cpu_stages = [json.loads(line) for line in open(output_dir / 'cpu' / 'stages.jsonl')]
+    allocation_stages = [json.loads(line) for line in open(output_dir / 'allocations' / 'stages.jsonl')]
+    assert 'top_allocations' not in cpu_stages[0]
+    assert [stage['stage'] for stage in allocation_stages] == [stage['stage'] for stage in cpu_stages]
+    assert all('top_allocations' in stage for stage in allocation_stages)
+
+    report = (output_dir / 'reports' / 'ACME.txt').read_text(encoding='utf-8')
+    assert report.startswith('ACME ')
+    assert 'TATA' not in report
+
+
+def test_profiler_refuses_sampling_while_tracing(tmp_path):
+    with pytest.raises(ValueError):
+        profiling.PipelineProfiler(str(tmp_path), sample_cpu=True, trace_allocations=True)
@@ -0,0 +1,69 @@
+import json
+import math
+
+import pandas as pd
+
+from ratios import build_top_ratios_table, normalize_top_ratios
+
+
+RAW_RATIOS = {
+    'https://www.screener.in/company/TATAMOTORS/consolidated/': {
+        'Market Cap': '₹ 2,64,873 Cr.',
+        'High / Low': '₹ 1,179 / 536',
+        'Dividend Yield': '0.83 %',
+    },
+    'https://www.screener.in/company/NEWLIST/': {},
+    'https://www.screener.in/company/INFY/consolidated/': {
+        'Market Cap': '₹ 6,10,012 Cr.',
+        'High / Low': '₹ 2,006 / 1,307',
+        'Dividend Yield': '2.60 %',
+    },
+}
+
+
+def test_normalize_top_ratios_values():
+    table = normalize_top_ratios(RAW_RATIOS)
+
+    tata = table.loc['https://www.screener.in/company/TATAMOTORS/consolidated/']
+    assert tata['Market Cap'] == 264873.0
+    assert tata['High'] == 1179.0
+    assert tata['Low'] == 536.0
+    assert tata['Dividend Yield'] == 0.83
+    assert (table.dtypes == 'float64').all()
+
+
+def test_normalize_top_ratios_keeps_companies_without_ratios():
+    table = normalize_top_ratios(RAW_RATIOS)
+
+    assert list(table.index) == list(RAW_RATIOS)
+    assert table.loc['https://www.screener.in/company/NEWLIST/'].isna().all()
+
+
+def test_normalize_top_ratios_has_no_unsplit_pair_columns():
+    table = normalize_top_ratios(RAW_RATIOS)
+
+    assert sorted(table.columns) == ['Dividend Yield', 'High', 'Low', 'Market Cap']
+
+
+def test_normalize_top_ratios_all_empty():
+    table = normalize_top_ratios({'a': {}, 'b': {}})
+
+    assert list(table.index) == ['a', 'b']
+    assert table.empty
+
+
+def test_build_top_ratios_table_writes_every_company(tmp_path):
+    universe_file = tmp_path / 'universe_data.jsonl'
+    with open(universe_file, 'w', encoding='utf-8') as f:
+        for url, ratios in RAW_RATIOS.items():
+            name = url.rstrip('/').split('/')[-1]
+            f.write(json.dumps({'Name': name, 'Url': url, 'top_ratios': ratios}) + "\n")
+
+    output_file = tmp_path / 'top_ratios.csv'
+    build_top_ratios_table(str(universe_file), str(output_file))
+
+    written = pd.read_csv(output_file, index_col='Url')
+    assert list(written.index) == list(RAW_RATIOS)
+    assert 'High / Low' not in written.columns
+    assert written.loc['https://www.screener.in/company/NEWLIST/', 'Name'] == 'NEWLIST'
+    assert math.isnan(written.loc['https://www.screener.in/company/NEWLIST/', 'Market Cap'])
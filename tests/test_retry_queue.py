@@ -0,0 +1,76 @@
+from retry_queue import ItemOutcome, RetryQueue, Status, load_dead_letters, replay_dead_letters
+
+
+COMPANY = {'S.No': '1', 'Name': 'Tata Motors', 'Url': 'https://www.screener.in/company/TATAMOTORS/consolidated/'}
+
+
+def failed(item, retryable=True):
+    return ItemOutcome(item, Status.FAILED, error="fetch error: 503", retryable=retryable)
+
+
+def test_dead_letters_are_recorded_once_across_runs(tmp_path):
+    dead_letter_file = str(tmp_path / 'dead_letters.jsonl')
+
+    for _ in range(2):
+        queue = RetryQueue(dead_letter_file=dead_letter_file, kind='company')
+        queue.dead_letter(failed(COMPANY))
+        queue.dead_letter(failed(dict(COMPANY)))
+        assert queue.dead_lettered == 2
+
+    with open(dead_letter_file, 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+    other_kind = RetryQueue(dead_letter_file=dead_letter_file, kind='listing_page')
+    other_kind.dead_letter(failed(3))
+    assert [entry['kind'] for entry in load_dead_letters(dead_letter_file)] == ['company', 'listing_page']
+
+
+def test_load_dead_letters_dedupes_older_files(tmp_path):
+    dead_letter_file = tmp_path / 'dead_letters.jsonl'
+    dead_letter_file.write_text(
+        '{"kind": "company", "item": {"Name": "A"}, "error": "old", "attempts": 5}\n'
+        '{"kind": "company", "item": {"Name": "B"}, "error": "b", "attempts": 5}\n'
+        '{"kind": "company", "item": {"Name": "A"}, "error": "new", "attempts": 5}\n'
+        '{"kind": "comp',
+        encoding='utf-8',
+    )
+
+    entries = load_dead_letters(str(dead_letter_file), kind='company')
+    assert [(entry['item']['Name'], entry['error']) for entry in entries] == [('B', 'b'), ('A', 'new')]
+
+
+def test_interrupted_replay_keeps_unprocessed_items(tmp_path):
+    dead_letter_file = str(tmp_path / 'dead_letters.jsonl')
+    queue = RetryQueue(dead_letter_file=dead_letter_file, kind='company')
+    for name in ('A', 'B', 'C'):
+        queue.dead_letter(failed({'Name': name}))
+
+    replayed = []
+    replay = replay_dead_letters(lambda item: ItemOutcome(item, Status.OK, value=item), 'company', dead_letter_file)
+    for outcome in replay:
+        replayed.append(outcome.item['Name'])
+        if outcome.item['Name'] == 'A':
+            # e.g. Ctrl-C while the caller writes the second item
+            next(replay)
+            replay.close()
+            break
+
+    assert replayed == ['A']
+    assert [entry['item']['Name'] for entry in load_dead_letters(dead_letter_file)] == ['B', 'C']
+
+
+def test_replay_keeps_items_that_fail_again(tmp_path):
+    dead_letter_file = str(tmp_path / 'dead_letters.jsonl')
+    queue = RetryQueue(dead_letter_file=dead_letter_file, kind='company')
+    for name in ('A', 'B'):
+        queue.dead_letter(failed({'Name': name}))
+
+    def process(item):
+        if item['Name'] == 'B':
+            return failed(item, retryable=False)
+        return ItemOutcome(item, Status.OK, value=item)
+
+    replayed = [outcome.item['Name'] for outcome in replay_dead_letters(process, 'company', dead_letter_file)]
+
+    assert replayed == ['A']
+    assert [entry['item']['Name'] for entry in load_dead_letters(dead_letter_file)] == ['B']
@@ -0,0 +1,68 @@
+import os
+
+from main_executor import SECTION_EXTRACTORS, process_saved_pages
+from pages import company_page
+from section_cache import MISS, SectionCache, content_hash
+
+
+def entry_paths(cache_dir):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), cache_dir)
+        for root, _, files in os.walk(cache_dir)
+        for name in files
+    )
+
+
+def cache_size(cache_dir):
+    return sum(os.path.getsize(os.path.join(cache_dir, path)) for path in entry_paths(cache_dir))
+
+
+def test_version_bump_misses_only_that_section(tmp_path):
+    cache = SectionCache(str(tmp_path))
+    page_hash = content_hash(b'<html>page</html>')
+    cache.put('shareholding', 1, page_hash, {'Promoters': ['50.00%']})
+    cache.put('concalls', 1, page_hash, [])
+
+    assert cache.get('shareholding', 2, page_hash) is MISS
+    assert cache.get('shareholding', 1, page_hash) == {'Promoters': ['50.00%']}
+    assert cache.get('concalls', 1, page_hash) == []
+
+
+def test_eviction_keeps_cache_under_max_bytes(tmp_path):
+    value = {'text': 'x' * 1000}
+    cache = SectionCache(str(tmp_path), max_bytes=10_000, low_water=0.5)
+
+    for i in range(40):
+        page_hash = content_hash(f"page {i}".encode())
+        cache.put('concalls', 1, page_hash, value)
+        # Entries written later are more recently used
+        os.utime(cache._path('concalls', 1, page_hash), (i, i))
+        assert cache_size(str(tmp_path)) <= 10_000
+
+    assert cache.get('concalls', 1, content_hash(b'page 39')) == value
+    assert cache.get('concalls', 1, content_hash(b'page 0')) is MISS
+
+
+def test_purge_stale_versions(tmp_path):
+    cache = SectionCache(str(tmp_path))
+    page_hash = content_hash(b'page')
+    cache.put('shareholding', 1, page_hash, {})
+    cache.put('shareholding', 2, page_hash, {})
+    cache.put('retired_section', 1, page_hash, {})
+
+    cache.purge_stale_versions({'shareholding': 2})
+
+    assert entry_paths(str(tmp_path)) == [os.path.join('shareholding', 'v2', page_hash[:2], f"{page_hash}.json")]
+
+
+def test_process_saved_pages_purges_old_extractor_versions(tmp_path):
+    pages_dir = tmp_path / 'pages'
+    pages_dir.mkdir()
+    (pages_dir / 'ACME.html').write_bytes(company_page(1))
+    cache_dir = str(tmp_path / 'cache')
+    SectionCache(cache_dir).put('shareholding', 0, content_hash(company_page(1)), {})
+
+    process_saved_pages(str(pages_dir), str(tmp_path / 'universe.jsonl'), cache_dir=cache_dir)
+
+    versions = {path.split(os.sep)[0]: path.split(os.sep)[1] for path in entry_paths(cache_dir)}
+    assert versions == {name: f"v{version}" for name, (_, version) in SECTION_EXTRACTORS.items()}
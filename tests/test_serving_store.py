@@ -0,0 +1,50 @@
+import json
+
+from serving_store import ServingStore, build_serving_store
+
+
+def shareholding(promoters):
+    return {
+        'periods': ['Sep 2024', 'Dec 2024'],
+        'labels': ['Promoters', 'FIIs'],
+        'values': [promoters, promoters + 1, 20.0, 21.0],
+    }
+
+
+def write_universe(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def record(url, name, tables):
+    return {'Url': url, 'Name': name, 'financial_tables': tables, 'top_ratios': {}}
+
+
+def test_build_serving_store_series(tmp_path):
+    universe = tmp_path / 'universe.jsonl'
+    write_universe(universe, [
+        record('/company/A/', 'Alpha', {'quarterly-shp': shareholding(50.0)}),
+        record('/company/B/', 'Beta', {}),
+    ])
+    build_serving_store(str(universe), store_dir=str(tmp_path / 'store'))
+
+    store = ServingStore(str(tmp_path / 'store'))
+    assert store.series('Alpha', 'Promoters') == [('Sep 2024', 50.0), ('Dec 2024', 51.0)]
+    assert store.series('/company/B/', 'Promoters') == []
+
+
+def test_later_line_replaces_company(tmp_path):
+    universe = tmp_path / 'universe.jsonl'
+    write_universe(universe, [
+        record('/company/A/', 'Alpha', {'quarterly-shp': shareholding(50.0)}),
+        record('/company/B/', 'Beta', {'quarterly-shp': shareholding(30.0)}),
+        record('/company/A/', 'Alpha', {}),
+        record('/company/B/', 'Beta', {'quarterly-shp': shareholding(35.0)}),
+    ])
+    build_serving_store(str(universe), store_dir=str(tmp_path / 'store'))
+
+    store = ServingStore(str(tmp_path / 'store'))
+    assert len(store.companies) == 2
+    assert store.series('Alpha', 'Promoters') == []
+    assert store.series('Beta', 'Promoters') == [('Sep 2024', 35.0), ('Dec 2024', 36.0)]
@@ -0,0 +1,45 @@
+from bs4 import BeautifulSoup
+
+import shareholding_breakdowns
+from pages import company_page
+from shareholding_breakdowns import extract_shareholding_drilldowns, fetch_breakdown
+
+
+class FakeSession:
+    def __init__(self):
+        self.requests = 0
+
+    def get(self, url, timeout=None):
+        self.requests += 1
+        session = self
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return [{'name': 'Holder', 'request': session.requests}]
+
+        return Response()
+
+
+def test_drilldowns_carry_latest_period():
+    drilldowns = extract_shareholding_drilldowns(BeautifulSoup(company_page(7), 'html.parser'))
+
+    assert drilldowns['company_id'] == '7'
+    assert [drilldown['category'] for drilldown in drilldowns['drilldowns']] == ['Promoters', 'FIIs', 'DIIs', 'Public']
+    assert {drilldown['as_of'] for drilldown in drilldowns['drilldowns']} == {'Dec 2021'}
+
+
+def test_breakdown_cache_expires_with_new_period(tmp_path, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(shareholding_breakdowns, '_session', lambda: session)
+    url = 'https://www.screener.in/api/3/7/investors/promoters/quarterly/'
+
+    first = fetch_breakdown(url, str(tmp_path), as_of='Mar 2025')
+    assert fetch_breakdown(url, str(tmp_path), as_of='Mar 2025') == first
+    assert session.requests == 1
+
+    fetch_breakdown(url, str(tmp_path), as_of='Jun 2025')
+    fetch_breakdown(url, str(tmp_path))
+    assert session.requests == 3
@@ -0,0 +1,66 @@
+import os
+
+import url_resolver
+from url_resolver import download_document, load_resolver_cache, record_resolution
+
+
+class FakeResponse:
+    def __init__(self, url, status_code, body=b'', content_type=None):
+        self.url = url
+        self.status_code = status_code
+        self.body = body
+        self.headers = {'Content-Type': content_type} if content_type else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise url_resolver.requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+def test_expired_final_url_falls_back_to_source_url(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / 'cache.jsonl')
+    cache = {}
+    record_resolution(cache, {
+        'url': 'https://example.com/doc',
+        'final_url': 'https://cdn.example.com/doc?signature=old',
+        'content_type': 'application/pdf',
+        'extension': '.pdf',
+        'size': 9,
+        'path': str(tmp_path / 'report.pdf'),
+    }, cache_file)
+
+    requested = []
+
+    def fake_get(url, **kwargs):
+        requested.append(url)
+        if url == 'https://cdn.example.com/doc?signature=old':
+            return FakeResponse(url, 403)
+        return FakeResponse('https://cdn.example.com/doc?signature=new', 200, b'%PDF-1.7 new', 'application/pdf')
+
+    monkeypatch.setattr(url_resolver.requests, 'get', fake_get)
+
+    filepath, downloaded = download_document('https://example.com/doc', str(tmp_path), 'report', {}, cache,
+                                             cache_file=cache_file)
+
+    assert downloaded
+    assert requested == ['https://cdn.example.com/doc?signature=old', 'https://example.com/doc']
+    with open(filepath, 'rb') as f:
+        assert f.read() == b'%PDF-1.7 new'
+    assert load_resolver_cache(cache_file)['https://example.com/doc']['final_url'] == \
+        'https://cdn.example.com/doc?signature=new'
+
+
+def test_existing_file_is_not_downloaded_again(tmp_path, monkeypatch):
+    (tmp_path / 'report.pdf').write_bytes(b'%PDF')
+    monkeypatch.setattr(url_resolver.requests, 'get', None)
+
+    filepath, downloaded = download_document('https://example.com/doc', str(tmp_path), 'report', {}, {},
+                                             cache_file=str(tmp_path / 'cache.jsonl'))
+
+    assert not downloaded
+    assert os.path.basename(filepath) == 'report.pdf'
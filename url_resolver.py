@@ -0,0 +1,169 @@
+import json
+import os
+
+import requests
+
+
+RESOLVER_CACHE_FILE = "url_resolution_cache.jsonl"
+
+# Document URLs not to download, one per line (written by crawl_planner.py)
+SKIP_LIST_FILE = "oversized_documents.txt"
+
+CONTENT_TYPE_EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'application/zip': '.zip',
+    'application/x-zip-compressed': '.zip',
+    'text/html': '.html',
+    'application/xhtml+xml': '.html',
+    'text/plain': '.txt',
+    'application/msword': '.doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+}
+
+
+def sniff_extension(first_bytes, content_type=None):
+    """
+    Work out a file's real type from its first bytes, falling back to the
+    Content-Type header
+
+    Returns:
+        Extension such as '.pdf', or None if neither source is conclusive
+    """
+    head = first_bytes.lstrip()[:512].lower()
+
+    if head.startswith(b'%pdf'):
+        return '.pdf'
+    if first_bytes.startswith(b'PK\x03\x04'):
+        return '.zip'
+    if first_bytes.startswith(b'\xd0\xcf\x11\xe0'):
+        return '.doc'
+    if head.startswith(b'<!doctype html') or b'<html' in head:
+        return '.html'
+
+    if content_type:
+        return CONTENT_TYPE_EXTENSIONS.get(content_type.split(';')[0].strip().lower())
+    return None
+
+
+def load_resolver_cache(cache_file=RESOLVER_CACHE_FILE):
+    """
+    Load the resolver cache as a dictionary of source URL -> entry
+
+    The cache is an append-only JSON lines file; later lines win.
+    """
+    cache = {}
+    if not os.path.exists(cache_file):
+        return cache
+
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Partially written last line from an interrupted run
+                continue
+            cache[entry['url']] = entry
+    return cache
+
+
+def record_resolution(cache, entry, cache_file=RESOLVER_CACHE_FILE):
+    """Add an entry to the in-memory cache and append it to the cache file"""
+    cache[entry['url']] = entry
+    with open(cache_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def download_document(url, directory, stem, headers, cache, fallback_extension='.pdf',
+                      cache_file=RESOLVER_CACHE_FILE):
+    """
+    Download a document, naming it by its real type
+
+    A cached URL is fetched straight from its final URL, skipping the
+    redirect chain, and its file name is known before any request so an
+    existing file is skipped without touching the network. If the final URL
+    now returns a client error (e.g. an expired signed link) the source URL
+    is followed again. The type is sniffed from the first chunk and the
+    resolution is cached.
+
+    Args:
+        url: Source URL as found on the page
+        directory: Download directory
+        stem: File name without extension
+        headers: Request headers
+        cache: Dictionary from load_resolver_cache
+        fallback_extension: Extension used when the type cannot be sniffed
+
+    Returns:
+        (filepath, downloaded) where downloaded is False if the file already existed
+    """
+    entry = cache.get(url)
+    if entry:
+        filepath = os.path.join(directory, stem + entry['extension'])
+        if os.path.exists(filepath):
+            return filepath, False
+        request_url = entry['final_url']
+    else:
+        # File from a run before this URL was resolved, named by the guessed type
+        filepath = os.path.join(directory, stem + fallback_extension)
+        if os.path.exists(filepath):
+            return filepath, False
+        request_url = url
+
+    partial_path = os.path.join(directory, stem + '.part')
+    response = requests.get(request_url, headers=headers, stream=True, timeout=30)
+    if request_url != url and 400 <= response.status_code < 500:
+        # Cached final URLs can be signed or expiring; resolve the source URL
+        # again and record where it leads now
+        response.close()
+        response = requests.get(url, headers=headers, stream=True, timeout=30)
+    try:
+        response.raise_for_status()
+
+        extension = None
+        size = 0
+        with open(partial_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if not chunk:
+                    continue
+                if extension is None:
+                    extension = sniff_extension(chunk, response.headers.get('Content-Type')) or fallback_extension
+                f.write(chunk)
+                size += len(chunk)
+
+        final_url = response.url
+        content_type = response.headers.get('Content-Type')
+    finally:
+        response.close()
+
+    extension = extension or fallback_extension
+    filepath = os.path.join(directory, stem + extension)
+    os.replace(partial_path, filepath)
+
+    record_resolution(cache, {
+        'url': url,
+        'final_url': final_url,
+        'content_type': content_type,
+        'extension': extension,
+        'size': size,
+        'path': filepath,
+    }, cache_file)
+
+    return filepath, True
+
+
+def documents_by_type(cache):
+    """Group downloaded files by their sniffed extension, without opening them"""
+    grouped = {}
+    for entry in cache.values():
+        if entry.get('path') and os.path.exists(entry['path']):
+            grouped.setdefault(entry['extension'], []).append(entry['path'])
+    return grouped
+
+
+def load_skip_list(skip_list_file=SKIP_LIST_FILE):
+    """Set of document URLs that downloads should skip"""
+    if not os.path.exists(skip_list_file):
+        return set()
+
+    with open(skip_list_file, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}